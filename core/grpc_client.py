@@ -1,22 +1,127 @@
 """
 Simple gRPC client wrapper to call a remote PipelineService.
+
+The client keeps a small pool of channels, each with its own TCP connection, and
+dispatches calls round-robin so one slow response cannot head-of-line block the
+others on a single HTTP/2 connection. Requests are gzip-compressed by default since
+the payload is mostly story text.
 """
+import itertools
+import threading
 from typing import Optional
 import grpc
 
 from core.message import PipelineMessage
 from core.grpc_utils import pipeline_message_to_proto, proto_to_pipeline_message
 
+# Channel options applied to every pooled channel; caller-supplied options win
+_DEFAULT_CHANNEL_OPTIONS = [
+    # Give each channel its own subchannel pool so they don't share one connection
+    ("grpc.use_local_subchannel_pool", 1),
+    ("grpc.max_concurrent_streams", 1024),
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+]
+
+
+class _ProtoCodec:
+    """Per-thread reusable request/response protos for the Process call.
+
+    grpc-python needs the serializer to return a fresh bytes object, so the wire
+    buffer itself cannot be pooled; instead each calling thread keeps one request
+    and one response message that are cleared and refilled on every call. The
+    response is converted to a PipelineMessage before the thread issues its next
+    call, so reusing it is safe.
+    """
+
+    def __init__(self, message_cls):
+        self._message_cls = message_cls
+        self._local = threading.local()
+
+    def request(self):
+        msg = getattr(self._local, "request", None)
+        if msg is None:
+            msg = self._local.request = self._message_cls()
+        return msg
+
+    def parse(self, data: bytes):
+        msg = getattr(self._local, "response", None)
+        if msg is None:
+            msg = self._local.response = self._message_cls()
+        else:
+            msg.Clear()
+        msg.MergeFromString(data)
+        return msg
+
 
 class PipelineClient:
-    def __init__(self, host: str, port: int, options: Optional[list] = None):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        options: Optional[list] = None,
+        pool_size: int = 4,
+        compression: Optional[grpc.Compression] = grpc.Compression.Gzip,
+    ):
         target = f"{host}:{port}"
-        self._channel = grpc.insecure_channel(target, options=options or [])
-        from core.grpc import pipeline_pb2_grpc
+        overrides = dict(options or [])
+        channel_options = [(k, v) for k, v in _DEFAULT_CHANNEL_OPTIONS if k not in overrides]
+        channel_options.extend(overrides.items())
+        from core.grpc import pipeline_pb2
+
+        service = pipeline_pb2.DESCRIPTOR.services_by_name["PipelineService"]
+        method = f"/{service.full_name}/Process"
+        self._codec = _ProtoCodec(pipeline_pb2.PipelineMessage)
 
-        self._stub = pipeline_pb2_grpc.PipelineServiceStub(self._channel)
+        self._channels = [
+            grpc.insecure_channel(target, options=channel_options, compression=compression)
+            for _ in range(max(1, pool_size))
+        ]
+        self._calls = [
+            c.unary_unary(
+                method,
+                request_serializer=pipeline_pb2.PipelineMessage.SerializeToString,
+                response_deserializer=self._codec.parse,
+            )
+            for c in self._channels
+        ]
+        # next() on itertools.cycle is atomic under the GIL, so this is thread-safe
+        self._next_call = itertools.cycle(self._calls).__next__
+        # Non-blocking variants: responses are parsed on grpc's polling thread, so
+        # they get fresh messages instead of the per-thread reusable one
+        self._future_calls = [
+            c.unary_unary(
+                method,
+                request_serializer=pipeline_pb2.PipelineMessage.SerializeToString,
+                response_deserializer=pipeline_pb2.PipelineMessage.FromString,
+            )
+            for c in self._channels
+        ]
+        self._next_future_call = itertools.cycle(self._future_calls).__next__
 
     def process(self, message: PipelineMessage, timeout: Optional[float] = 10.0) -> PipelineMessage:
-        req = pipeline_message_to_proto(message)
-        resp = self._stub.Process(req, timeout=timeout)
+        req = pipeline_message_to_proto(message, self._codec.request())
+        resp = self._next_call()(req, timeout=timeout)
         return proto_to_pipeline_message(resp)
+
+    def process_future(
+        self,
+        message: PipelineMessage,
+        timeout: Optional[float] = 10.0,
+        reply_fields: Optional[list] = None,
+    ) -> grpc.Future:
+        """Start a Process call without blocking.
+
+        The request is serialized before this returns; the future's result() is the
+        response proto (convert it with proto_to_pipeline_message). With
+        reply_fields, the server sends back only those fields and the timestamps.
+        """
+        req = pipeline_message_to_proto(message, self._codec.request())
+        if reply_fields:
+            req.reply_fields.extend(reply_fields)
+        return self._next_future_call().future(req, timeout=timeout)
+
+    def close(self) -> None:
+        for channel in self._channels:
+            channel.close()
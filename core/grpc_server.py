@@ -4,24 +4,55 @@ Common gRPC server harness for services.
 Provides a server that delegates Process(request) to a provided handler function:
     handler: Callable[[PipelineMessage], PipelineMessage]
 """
+import os
 from concurrent import futures
-from typing import Callable
+from typing import Callable, Optional
 import grpc
 
 from core.message import PipelineMessage
 from core.grpc_utils import pipeline_message_to_proto, proto_to_pipeline_message
 
+# Handlers are mostly I/O bound (the hub waits on downstream calls), so size the
+# pool well above the core count
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
 
-def serve(handler: Callable[[PipelineMessage], PipelineMessage], host: str = "0.0.0.0", port: int = 50051):
+DEFAULT_SERVER_OPTIONS = [
+    # gRPC enables SO_REUSEPORT unless told otherwise, which lets a second server
+    # (a stale process, a double start) bind the same port and silently take part
+    # of the traffic; it is only turned on with GRPC_SO_REUSEPORT=1
+    ("grpc.so_reuseport", int(os.environ.get("GRPC_SO_REUSEPORT", "0") == "1")),
+    ("grpc.max_concurrent_streams", 1024),
+    ("grpc.max_send_message_length", -1),
+    ("grpc.max_receive_message_length", -1),
+]
+
+
+def serve(
+    handler: Callable[[PipelineMessage], PipelineMessage],
+    host: str = "0.0.0.0",
+    port: int = 50051,
+    max_workers: Optional[int] = None,
+    options: Optional[list] = None,
+    compression: Optional[grpc.Compression] = grpc.Compression.Gzip,
+):
     from core.grpc import pipeline_pb2_grpc
 
     class _Servicer(pipeline_pb2_grpc.PipelineServiceServicer):
         def Process(self, request, context):
             pm = proto_to_pipeline_message(request)
             out_pm = handler(pm)
+            if request.reply_fields:
+                out_pm = out_pm.subset(request.reply_fields)
             return pipeline_message_to_proto(out_pm)
 
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    executor = futures.ThreadPoolExecutor(
+        max_workers=max_workers or DEFAULT_MAX_WORKERS, thread_name_prefix="pipeline-grpc"
+    )
+    server = grpc.server(
+        executor,
+        options=DEFAULT_SERVER_OPTIONS if options is None else options,
+        compression=compression,
+    )
     pipeline_pb2_grpc.add_PipelineServiceServicer_to_server(_Servicer(), server)
     server.add_insecure_port(f"{host}:{port}")
     server.start()
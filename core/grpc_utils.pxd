@@ -0,0 +1,5 @@
+# Optional Cython declarations for core/grpc_utils.py (pure-Python mode).
+# Used only when building with PIPELINE_ENABLE_SPEEDUPS=1; see setup.py.
+
+cdef void _dict_to_typed(object msg, dict data) except *
+cpdef dict _typed_to_dict(object msg)
@@ -1,84 +1,124 @@
 """
 Utilities to convert between internal PipelineMessage and gRPC proto messages.
 
-We serialize complex nested dict fields to JSON strings to keep the proto simple.
+Nested fields are carried as native protobuf messages so that a hop costs a
+single protobuf parse. Known keys of the analysis / image concept / audio script
+dicts map onto typed fields; anything else travels JSON-encoded in the message's
+`extra` bytes field so that no data is dropped. Free-form dicts (metadata,
+formatted_output, processing_metadata) are JSON-encoded bytes too, which keeps
+ints and floats apart exactly as the RPC and local modes do.
 """
 import json
-from typing import Dict, Any
+from typing import Any, Dict
 
 from core.message import PipelineMessage
 
-
-def _safe_dumps(obj: Any) -> str:
-    if obj is None:
-        return ""
-    try:
-        return json.dumps(obj, default=str)
-    except Exception:
-        return ""
-
-
-def _safe_loads(s: str):
-    if not s:
-        return None
-    try:
-        return json.loads(s)
-    except Exception:
-        return None
-
-
-def pipeline_message_to_proto(pm: PipelineMessage):
-    # Lazy import to avoid hard dependency when grpc mode isn't used
-    from core.grpc import pipeline_pb2
-
-    proto = pipeline_pb2.PipelineMessage(
-        user_input=pm.user_input or "",
-        story_text=pm.story_text or "",
-        analysis_json=_safe_dumps(pm.analysis),
-        image_concept_json=_safe_dumps(pm.image_concept),
-        audio_script_json=_safe_dumps(pm.audio_script),
-        translations_json=_safe_dumps(pm.translations),
-        formatted_output_json=_safe_dumps(pm.formatted_output),
-        metadata_json=_safe_dumps(pm.metadata),
-        timestamps_json=_safe_dumps(
-            {name: ts.to_dict() for name, ts in pm.timestamps.items()}
-        ),
-    )
+try:
+    import orjson as _orjson
+except ImportError:  # optional; stdlib json is used instead
+    _orjson = None
+
+try:
+    from core.grpc import pipeline_pb2 as _pipeline_pb2
+
+    _PBMessage = _pipeline_pb2.PipelineMessage
+except ImportError:  # stubs not generated (non-grpc modes)
+    _PBMessage = None
+
+
+if _orjson is not None:
+    def _encode_free(data: Any) -> bytes:
+        """JSON-encode a free-form value, stringifying anything JSON can't hold."""
+        return _orjson.dumps(data, default=str, option=_orjson.OPT_NON_STR_KEYS)
+
+    _decode_free = _orjson.loads
+else:
+    def _encode_free(data: Any) -> bytes:
+        """JSON-encode a free-form value, stringifying anything JSON can't hold."""
+        return json.dumps(data, default=str).encode("utf-8")
+
+    def _decode_free(raw: bytes) -> Any:
+        return json.loads(raw.decode("utf-8"))
+
+
+def _dict_to_typed(msg, data: Dict[str, Any]) -> None:
+    """Fill a typed submessage from a dict, spilling unknown keys into `extra`."""
+    msg.SetInParent()
+    fields = msg.DESCRIPTOR.fields_by_name
+    extra = {}
+    for key, value in data.items():
+        fd = fields.get(key)
+        if fd is None or key == "extra" or value is None:
+            extra[key] = value
+            continue
+        try:
+            if fd.type == fd.TYPE_BYTES:
+                setattr(msg, key, _encode_free(value))
+            elif fd.label == fd.LABEL_REPEATED:
+                getattr(msg, key).extend(value)
+            else:
+                setattr(msg, key, value)
+        except (TypeError, ValueError, AttributeError):
+            msg.ClearField(key)
+            extra[key] = value
+    if extra:
+        msg.extra = _encode_free(extra)
+
+
+def _typed_to_dict(msg) -> Dict[str, Any]:
+    result: Dict[str, Any] = {}
+    extra = None
+    for fd, value in msg.ListFields():
+        if fd.name == "extra":
+            extra = value
+        elif fd.type == fd.TYPE_BYTES:
+            result[fd.name] = _decode_free(value)
+        elif fd.label == fd.LABEL_REPEATED:
+            result[fd.name] = list(value)
+        else:
+            result[fd.name] = value
+    if extra is not None:
+        result.update(_decode_free(extra))
+    return result
+
+
+def pipeline_message_to_proto(pm: PipelineMessage, proto=None):
+    """Build a proto PipelineMessage from pm.
+
+    If proto is given it is cleared and refilled in place, so callers can reuse
+    one message object across calls.
+    """
+    if proto is None:
+        if _PBMessage is None:
+            # Re-raise the original ImportError for a clear message
+            from core.grpc import pipeline_pb2  # noqa: F401
+        proto = _PBMessage()
+    else:
+        proto.Clear()
+    proto.user_input = pm.user_input or ""
+    proto.story_text = pm.story_text or ""
+    if pm.analysis is not None:
+        _dict_to_typed(proto.analysis, pm.analysis)
+    if pm.image_concept is not None:
+        _dict_to_typed(proto.image_concept, pm.image_concept)
+    if pm.audio_script is not None:
+        _dict_to_typed(proto.audio_script, pm.audio_script)
+    if pm.translations is not None:
+        proto.has_translations = True
+        proto.translations.update({k: str(v) for k, v in pm.translations.items()})
+    if pm.formatted_output is not None:
+        proto.formatted_output = _encode_free(pm.formatted_output)
+    if pm.metadata:
+        proto.metadata = _encode_free(pm.metadata)
+
+    for name, ts in pm.timestamps.items():
+        rec = proto.timestamps[name]
+        rec.service_name = ts.service_name
+        rec.received_ns = ts.received_time or 0
+        rec.started_ns = ts.start_time or 0
+        rec.completed_ns = ts.end_time or 0
     return proto
 
 
 def proto_to_pipeline_message(proto_msg) -> PipelineMessage:
-    data: Dict[str, Any] = {
-        "user_input": getattr(proto_msg, "user_input", "") or "",
-        "story": {"text": getattr(proto_msg, "story_text", "") or ""},
-    }
-
-    analysis = _safe_loads(getattr(proto_msg, "analysis_json", ""))
-    if analysis is not None:
-        data["analysis"] = analysis
-
-    image_concept = _safe_loads(getattr(proto_msg, "image_concept_json", ""))
-    if image_concept is not None:
-        data["image_concept"] = image_concept
-
-    audio_script = _safe_loads(getattr(proto_msg, "audio_script_json", ""))
-    if audio_script is not None:
-        data["audio_script"] = audio_script
-
-    translations = _safe_loads(getattr(proto_msg, "translations_json", ""))
-    if translations is not None:
-        data["translations"] = translations
-
-    formatted_output = _safe_loads(getattr(proto_msg, "formatted_output_json", ""))
-    if formatted_output is not None:
-        data["formatted_output"] = formatted_output
-
-    metadata = _safe_loads(getattr(proto_msg, "metadata_json", ""))
-    if metadata is not None:
-        data["metadata"] = metadata
-
-    timestamps = _safe_loads(getattr(proto_msg, "timestamps_json", ""))
-    if timestamps is not None:
-        data["timestamps"] = timestamps
-
-    return PipelineMessage.from_dict(data)
+    return PipelineMessage.from_proto(proto_msg)
@@ -1,46 +1,128 @@
 """
 Message format for pipeline communication with timestamp tracking.
 """
+import sys
 import time
 from dataclasses import dataclass, field
-from typing import Dict, Any, Optional
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
 
+# Slotted dataclasses (no per-instance __dict__) need Python 3.10+
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+
+@lru_cache(maxsize=1024)
+def _iso_seconds(seconds: int) -> str:
+    return datetime.fromtimestamp(seconds).isoformat()
+
+
+def _isoformat(timestamp_ns: int) -> str:
+    """Format like datetime.fromtimestamp(...).isoformat(), rounded to the microsecond.
+
+    The date/time part is memoized per whole second; only the microseconds are
+    formatted per call.
+    """
+    whole, rem = divmod(timestamp_ns, 1_000_000_000)
+    micros = (rem + 500) // 1000
+    if micros == 1_000_000:
+        whole += 1
+        micros = 0
+    base = _iso_seconds(whole)
+    return f"{base}.{micros:06d}" if micros else base
+
+
+# Fields a caller may ask a service to send back (reply_fields); see PipelineMessage.subset
+REPLY_FIELDS = frozenset((
+    "story_text", "analysis", "image_concept", "audio_script",
+    "translations", "formatted_output", "metadata",
+))
+
+
+def _seconds_to_ns(timestamp: Optional[float]) -> Optional[int]:
+    return round(timestamp * 1e9) if timestamp else None
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class TimestampRecord:
-    """Record of timestamps for a service invocation."""
+    """Record of timestamps for a service invocation.
+
+    Times are integer nanoseconds since the Unix epoch (time.time_ns()).
+    """
     service_name: str
-    received_time: Optional[float] = None  # Unix timestamp when request received
-    start_time: Optional[float] = None     # Unix timestamp when processing started
-    end_time: Optional[float] = None       # Unix timestamp when processing completed
-    
+    received_time: Optional[int] = None  # Unix time (ns) when request received
+    start_time: Optional[int] = None     # Unix time (ns) when processing started
+    end_time: Optional[int] = None       # Unix time (ns) when processing completed
+
+    # Cached (timestamp, iso string) pairs and the duration set on completion
+    _iso_received: Optional[Tuple[int, str]] = field(default=None, init=False, repr=False, compare=False)
+    _iso_started: Optional[Tuple[int, str]] = field(default=None, init=False, repr=False, compare=False)
+    _iso_completed: Optional[Tuple[int, str]] = field(default=None, init=False, repr=False, compare=False)
+    _duration_ms: Optional[float] = field(default=None, init=False, repr=False, compare=False)
+
+    def _iso(self, cache_attr: str, timestamp: int) -> str:
+        cached = getattr(self, cache_attr)
+        if cached is None or cached[0] != timestamp:
+            cached = (timestamp, _isoformat(timestamp))
+            setattr(self, cache_attr, cached)
+        return cached[1]
+
+    def set_completed(self, end_time: int) -> None:
+        """Record the completion time and precompute the duration."""
+        self.end_time = end_time
+        if self.start_time:
+            self._duration_ms = round((end_time - self.start_time) / 1_000_000, 2)
+
+    def to_wire(self) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+        """Raw (received, started, completed) nanoseconds for transport between services."""
+        return (self.received_time, self.start_time, self.end_time)
+
+    @classmethod
+    def from_entry(cls, service_name: str, entry: Any) -> "TimestampRecord":
+        """Build a record from a to_wire() tuple or a to_dict() dict."""
+        if isinstance(entry, (list, tuple)):
+            # Wire form from to_wire(): raw nanoseconds
+            received, started, completed = entry
+        else:
+            received = _seconds_to_ns(entry.get("received_timestamp"))
+            started = _seconds_to_ns(entry.get("started_timestamp"))
+            completed = _seconds_to_ns(entry.get("completed_timestamp"))
+        return cls(service_name=service_name,
+                   received_time=received,
+                   start_time=started,
+                   end_time=completed)
+
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary with formatted timestamps."""
+        """Convert to dictionary with formatted timestamps.
+
+        The *_timestamp values stay in float seconds, as in earlier output files.
+        """
         result = {
             "service_name": self.service_name,
         }
         
         if self.received_time:
-            result["received"] = datetime.fromtimestamp(self.received_time).isoformat()
-            result["received_timestamp"] = self.received_time
+            result["received"] = self._iso("_iso_received", self.received_time)
+            result["received_timestamp"] = self.received_time / 1e9
         
         if self.start_time:
-            result["started"] = datetime.fromtimestamp(self.start_time).isoformat()
-            result["started_timestamp"] = self.start_time
+            result["started"] = self._iso("_iso_started", self.start_time)
+            result["started_timestamp"] = self.start_time / 1e9
             
         if self.end_time:
-            result["completed"] = datetime.fromtimestamp(self.end_time).isoformat()
-            result["completed_timestamp"] = self.end_time
+            result["completed"] = self._iso("_iso_completed", self.end_time)
+            result["completed_timestamp"] = self.end_time / 1e9
             
         if self.start_time and self.end_time:
-            duration_ms = (self.end_time - self.start_time) * 1000
-            result["duration_ms"] = round(duration_ms, 2)
+            duration_ms = self._duration_ms
+            if duration_ms is None:
+                duration_ms = round((self.end_time - self.start_time) / 1_000_000, 2)
+            result["duration_ms"] = duration_ms
             
         return result
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class PipelineMessage:
     """Message passed between services in the pipeline."""
     # Core data
@@ -70,53 +152,80 @@ class PipelineMessage:
         """Get timestamp record for a service."""
         return self.timestamps.get(service_name)
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert message to dictionary for JSON serialization."""
-        result = {
-            "user_input": self.user_input,
-            "timestamps": {
-                name: ts.to_dict() for name, ts in self.timestamps.items()
-            }
-        }
-        
-        if self.story_text:
-            result["story"] = {
-                "text": self.story_text,
-                "word_count": len(self.story_text.split()) if self.story_text else 0,
-            }
-            
+    def subset(self, fields) -> "PipelineMessage":
+        """Copy holding only the named fields (see REPLY_FIELDS) and the timestamps.
+
+        Services use this to answer callers that already hold the rest of the
+        message; user_input is left empty and unknown names are ignored.
+        """
+        pm = PipelineMessage(user_input="", timestamps=self.timestamps)
+        for name in fields:
+            if name in REPLY_FIELDS:
+                setattr(pm, name, getattr(self, name))
+        return pm
+
+    def _compute_total_duration(self) -> Optional[float]:
+        """Milliseconds from the earliest start to the latest end, if known."""
+        min_start = max_end = None
+        for ts in self.timestamps.values():
+            start, end = ts.start_time, ts.end_time
+            if start and (min_start is None or start < min_start):
+                min_start = start
+            if end and (max_end is None or end > max_end):
+                max_end = end
+        if min_start is not None and max_end is not None:
+            return round((max_end - min_start) / 1_000_000, 2)
+        return None
+
+    def _add_set_fields(self, result: Dict[str, Any]) -> None:
+        """Copy the non-empty nested fields into result (shared by to_dict / to_wire)."""
         if self.analysis:
             result["analysis"] = self.analysis
-            
         if self.image_concept:
             result["image_concept"] = self.image_concept
-            
         if self.audio_script:
             result["audio_script"] = self.audio_script
-            
         if self.translations:
             result["translations"] = self.translations
-            
         if self.formatted_output:
             result["formatted_output"] = self.formatted_output
-            
         if self.metadata:
             result["metadata"] = self.metadata
-            
-        # Calculate total duration
-        if self.timestamps:
-            all_end_times = [ts.end_time for ts in self.timestamps.values() if ts.end_time]
-            all_start_times = [ts.start_time for ts in self.timestamps.values() if ts.start_time]
-            if all_start_times and all_end_times:
-                total_start = min(all_start_times)
-                total_end = max(all_end_times)
-                result["total_duration_ms"] = round((total_end - total_start) * 1000, 2)
-                
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert message to dictionary for JSON serialization."""
+        result = {
+            "user_input": self.user_input,
+            "timestamps": {name: ts.to_dict() for name, ts in self.timestamps.items()},
+        }
+        story_text = self.story_text
+        if story_text:
+            result["story"] = {"text": story_text, "word_count": len(story_text.split())}
+        self._add_set_fields(result)
+        total_duration_ms = self._compute_total_duration()
+        if total_duration_ms is not None:
+            result["total_duration_ms"] = total_duration_ms
+        return result
+
+    def to_wire(self) -> Dict[str, Any]:
+        """Convert message to a compact dict for RPC transport.
+
+        Unlike to_dict, timestamps are raw nanosecond tuples (no ISO strings) and
+        derived display fields (word count, total duration) are left out.
+        from_dict accepts both forms.
+        """
+        result = {
+            "user_input": self.user_input,
+            "timestamps": {name: ts.to_wire() for name, ts in self.timestamps.items()},
+        }
+        if self.story_text:
+            result["story_text"] = self.story_text
+        self._add_set_fields(result)
         return result
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "PipelineMessage":
-        """Reconstruct a PipelineMessage from a dict (the inverse of to_dict).
+        """Reconstruct a PipelineMessage from a dict (the inverse of to_dict / to_wire).
 
         This will preserve timestamps and nested fields where available.
         """
@@ -133,17 +242,39 @@ class PipelineMessage:
         ts_data = data.get("timestamps") or {}
         for name, tdict in ts_data.items():
             try:
-                received = tdict.get("received_timestamp")
-                started = tdict.get("started_timestamp")
-                completed = tdict.get("completed_timestamp")
-                tr = TimestampRecord(service_name=name,
-                                     received_time=received,
-                                     start_time=started,
-                                     end_time=completed)
-                pm.timestamps[name] = tr
+                pm.timestamps[name] = TimestampRecord.from_entry(name, tdict)
             except Exception:
                 # Ignore malformed timestamp entries
                 continue
 
         return pm
 
+    @classmethod
+    def from_proto(cls, proto_msg) -> "PipelineMessage":
+        """Build a PipelineMessage directly from a gRPC proto PipelineMessage.
+
+        Fields are read straight off the proto; no intermediate dict is built.
+        """
+        from core.grpc_utils import _typed_to_dict, _decode_free
+
+        has = proto_msg.HasField
+        pm = cls(
+            user_input=proto_msg.user_input,
+            story_text=proto_msg.story_text,
+            analysis=_typed_to_dict(proto_msg.analysis) if has("analysis") else None,
+            image_concept=_typed_to_dict(proto_msg.image_concept) if has("image_concept") else None,
+            audio_script=_typed_to_dict(proto_msg.audio_script) if has("audio_script") else None,
+            translations=dict(proto_msg.translations) if proto_msg.has_translations else None,
+            formatted_output=_decode_free(proto_msg.formatted_output) if has("formatted_output") else None,
+            metadata=_decode_free(proto_msg.metadata) if has("metadata") else {},
+        )
+
+        timestamps = pm.timestamps
+        for name, rec in proto_msg.timestamps.items():
+            timestamps[name] = TimestampRecord(
+                service_name=rec.service_name or name,
+                received_time=rec.received_ns or None,
+                start_time=rec.started_ns or None,
+                end_time=rec.completed_ns or None,
+            )
+        return pm
@@ -2,6 +2,7 @@
 Core pipeline implementation for local execution mode.
 This module provides the pipeline coordination logic.
 """
+import time
 from typing import Callable
 from core.message import PipelineMessage
 from core.timestamp_tracker import TimestampTracker
@@ -29,22 +30,24 @@ class Pipeline:
         Returns:
             Final message after pipeline execution
         """
+        services_get = self.services.get
+        now = time.time_ns
         for service_name in service_chain:
-            if service_name in self.services:
-                # Mark received
-                self.tracker.mark_received(message, service_name)
-                
-                # Mark started
-                self.tracker.mark_started(message, service_name)
-                
-                # Execute service
-                service_func = self.services[service_name]
-                message = service_func(message)
-                
-                # Mark completed
-                self.tracker.mark_completed(message, service_name)
-            else:
+            service_func = services_get(service_name)
+            if service_func is None:
                 raise ValueError(f"Service {service_name} not registered")
+
+            # Mark received and started (same instant for in-process dispatch)
+            ts = message.add_timestamp(service_name)
+            ts.received_time = ts.start_time = now()
+
+            # Execute service
+            result = service_func(message)
+
+            # Mark completed; the service may hand back a different message object
+            if result is not message:
+                ts = result.add_timestamp(service_name)
+            ts.set_completed(now())
+            message = result
         
         return message
-
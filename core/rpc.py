@@ -1,89 +1,627 @@
 """
-Simple JSON-over-TCP RPC utilities.
+Simple RPC utilities over TCP.
 
-Protocol (newline-delimited JSON):
+Protocol (length-prefixed frames):
+  Each frame is a 4-byte big-endian payload length followed by a MessagePack payload,
+  or a UTF-8 JSON payload when PIPELINE_RPC_CODEC=json (or no MessagePack library is
+  installed). Servers detect the codec of each request and answer in the same one.
   Request: {"id": <str>, "method": "process", "params": <PipelineMessage dict>}
   Response: {"id": <str>, "result": <PipelineMessage dict>} or {"id": <str>, "error": <message>}
+  If params carries "reply_fields": [<field name>, ...], the result only holds those
+  fields plus "timestamps" (for callers that already have the rest of the message).
 
-This module provides a tiny server (`serve`) and a client helper (`rpc_call`).
+A connection may carry any number of request/response frame pairs; `rpc_call`
+keeps one open connection per (host, port) per thread and reuses it.
+
+Batch request: {"id": <str>, "method": "batch", "params": {"calls": [<call>, ...]}}
+  Each call is {"id": <str>, "service": <service name or null>, "addr": <"host:port" or null>,
+  "input_from": <call id or null>, "params": <PipelineMessage dict>}. A call takes its params
+  from the result of the call named by input_from. It is forwarded with `rpc_call` to addr,
+  or to the named service as resolved by the receiving server from its own environment
+  (see `service_addr`), and runs on the receiving server when it has neither. The response
+  carries the result of the last call, so a dependent chain costs the client a single
+  round trip.
+
+Multi request: {"id": <str>, "method": "multi", "params": {"requests": [<PipelineMessage dict>, ...]}}
+  Independent requests coalesced by `RpcBatcher`. The result is a list with one
+  {"result": ...} or {"error": ...} entry per request, in order.
+
+Setting PIPELINE_RPC_BATCH_WINDOW_MS to a positive value makes `rpc_call` queue its
+request on a shared `RpcBatcher`, which holds requests for that many milliseconds so
+that concurrent calls to the same server share one frame.
+
+This module provides a tiny server (`serve`) and client helpers (`rpc_call`, `batch_call`,
+`rpc_call_many`).
 """
+import collections
 import json
+import os
+import selectors
 import socket
+import struct
 import threading
-from typing import Callable, Dict, Any, Optional
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional, Tuple
 import socketserver
 
+try:
+    import msgspec as _msgspec
+except ImportError:
+    _msgspec = None
 
-def _safe_json_dumps(obj: Any) -> str:
-    return json.dumps(obj, default=str)
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
 
+try:
+    import msgpack as _msgpack
+except ImportError:
+    _msgpack = None
 
-class _RPCHandler(socketserver.StreamRequestHandler):
-    """Internal handler that delegates to a provided function."""
+# Prefer msgspec, then orjson, then the stdlib encoder
+if _msgspec is not None:
+    _encoder = _msgspec.json.Encoder(enc_hook=str)
+    _decoder = _msgspec.json.Decoder()
 
-    def handle(self):
-        # Read a single line (one JSON request) and respond with JSON line
-        raw = self.rfile.readline()
-        if not raw:
-            return
-        try:
-            data = json.loads(raw.decode("utf-8"))
-        except Exception as e:
-            resp = {"id": None, "error": f"invalid_json: {e}"}
-            self.wfile.write((_safe_json_dumps(resp) + "\n").encode("utf-8"))
-            return
+    def _safe_json_dumps(obj: Any) -> bytes:
+        """Encode obj as UTF-8 JSON bytes, stringifying unsupported values."""
+        return _encoder.encode(obj)
+
+    def _json_loads(raw: bytes) -> Any:
+        return _decoder.decode(raw)
+
+elif _orjson is not None:
+    def _safe_json_dumps(obj: Any) -> bytes:
+        """Encode obj as UTF-8 JSON bytes, stringifying unsupported values."""
+        return _orjson.dumps(obj, default=str, option=_orjson.OPT_NON_STR_KEYS)
+
+    def _json_loads(raw: bytes) -> Any:
+        return _orjson.loads(raw)
+
+else:
+    def _safe_json_dumps(obj: Any) -> bytes:
+        """Encode obj as UTF-8 JSON bytes, stringifying unsupported values."""
+        return json.dumps(obj, default=str).encode("utf-8")
+
+    def _json_loads(raw: bytes) -> Any:
+        return json.loads(raw.decode("utf-8"))
+
+
+# MessagePack via msgspec, then the msgpack package
+if _msgspec is not None:
+    _mp_encoder = _msgspec.msgpack.Encoder(enc_hook=str)
+    _mp_decoder = _msgspec.msgpack.Decoder()
+    _msgpack_dumps = _mp_encoder.encode
+    _msgpack_loads = _mp_decoder.decode
+elif _msgpack is not None:
+    def _msgpack_dumps(obj: Any) -> bytes:
+        return _msgpack.packb(obj, use_bin_type=True, default=str)
+
+    def _msgpack_loads(raw: bytes) -> Any:
+        return _msgpack.unpackb(raw, raw=False, strict_map_key=False)
+else:
+    _msgpack_dumps = _msgpack_loads = None
+
+# Codec used for outgoing requests
+if os.environ.get("PIPELINE_RPC_CODEC", "msgpack").lower() == "json" or _msgpack_dumps is None:
+    _encode = _safe_json_dumps
+else:
+    _encode = _msgpack_dumps
+
+
+def _codec_for(raw: bytes):
+    """Return the (dumps, loads) pair matching an incoming frame.
+
+    Every request and response is a map, so JSON frames start with "{" while
+    MessagePack maps never do.
+    """
+    if raw[:1] == b"{" or _msgpack_loads is None:
+        return _safe_json_dumps, _json_loads
+    return _msgpack_dumps, _msgpack_loads
+
+
+_HEADER = struct.Struct(">I")
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytearray]:
+    """Read exactly size bytes into a preallocated buffer; None on clean EOF."""
+    buf = bytearray(size)
+    view = memoryview(buf)
+    offset = 0
+    while offset < size:
+        n = sock.recv_into(view[offset:])
+        if n == 0:
+            if offset == 0:
+                return None
+            raise ConnectionError("connection closed mid-frame")
+        offset += n
+    return buf
+
+
+# msgspec encoders can serialize straight into a caller-owned buffer
+_ENCODE_INTO: Dict[Callable[[Any], bytes], Callable[..., None]] = {}
+if _msgspec is not None:
+    _ENCODE_INTO[_safe_json_dumps] = _encoder.encode_into
+    _ENCODE_INTO[_msgpack_dumps] = _mp_encoder.encode_into
 
-        # Delegate
+# Per-thread scratch buffer for outgoing frames; dropped after an unusually large frame
+_scratch = threading.local()
+_SCRATCH_LIMIT = 1 << 20
+
+
+def _pack_frame(obj: Any, dumps: Callable[[Any], bytes]):
+    """Serialize obj with dumps and return the complete frame (header + payload).
+
+    With msgspec the payload is encoded directly after the header in this thread's
+    scratch buffer, so no intermediate payload object is built and nothing is copied
+    to prepend the header. The returned buffer is only valid until the thread's next
+    _pack_frame call.
+    """
+    encode_into = _ENCODE_INTO.get(dumps)
+    if encode_into is None:
+        payload = dumps(obj)
+        return _HEADER.pack(len(payload)) + payload
+    buf = getattr(_scratch, "buf", None)
+    if buf is None or len(buf) > _SCRATCH_LIMIT:
+        buf = _scratch.buf = bytearray()
+    encode_into(obj, buf, _HEADER.size)
+    _HEADER.pack_into(buf, 0, len(buf) - _HEADER.size)
+    return buf
+
+
+def _send_message(sock: socket.socket, obj: Any, dumps: Callable[[Any], bytes]) -> None:
+    sock.sendall(_pack_frame(obj, dumps))
+
+
+def _recv_frame(sock: socket.socket) -> Optional[bytearray]:
+    """Read one frame and return its payload, or None if the peer closed."""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (size,) = _HEADER.unpack(header)
+    payload = _recv_exact(sock, size) if size else bytearray()
+    if payload is None:
+        raise ConnectionError("connection closed mid-frame")
+    return payload
+
+
+# Batch calls name their target service so that the server running the batch resolves
+# it from its own network view: (env prefix, docker-compose host, default port)
+_SERVICE_ENDPOINTS = {
+    "service_a_story_generator": ("SERVICE_A", "service-a", 50051),
+    "service_b_story_analyzer": ("SERVICE_B", "service-b", 50052),
+    "service_c_parallel_hub": ("SERVICE_C", "service-c", 50057),
+    "service_d_aggregator": ("SERVICE_D", "service-d", 50058),
+}
+
+
+def service_addr(service: str) -> str:
+    """Return "host:port" for a pipeline service as seen from this process.
+
+    Uses <PREFIX>_ADDR, else <PREFIX>_HOST / <PREFIX>_PORT (e.g. SERVICE_B_HOST),
+    falling back to the docker-compose service name and port. SERVICE_PORT is not
+    consulted: inside a service container it is that service's own port.
+    """
+    prefix, default_host, default_port = _SERVICE_ENDPOINTS[service]
+    addr = os.environ.get(f"{prefix}_ADDR")
+    if addr:
+        return addr
+    host = os.environ.get(f"{prefix}_HOST") or default_host
+    return f"{host}:{os.environ.get(f'{prefix}_PORT') or default_port}"
+
+
+def _resolve_batch(handler: Callable[[Dict[str, Any]], Dict[str, Any]], calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Run a batch of calls in dependency order and return the last call's result.
+
+    Calls whose input is ready run together; a layer with more than one call is
+    executed concurrently.
+    """
+    results: Dict[str, Any] = {}
+
+    def invoke(call: Dict[str, Any]) -> Any:
+        source = call.get("input_from")
+        params = results[source] if source else call.get("params")
+        addr = call.get("addr")
+        if not addr and call.get("service"):
+            addr = service_addr(call["service"])
+        if not addr:
+            return handler(params)
+        host, _, port = addr.partition(":")
+        return rpc_call(host, int(port or "8000"), params)
+
+    pending = list(calls)
+    executor = None
+    try:
+        while pending:
+            layer = [c for c in pending if not c.get("input_from") or c["input_from"] in results]
+            if not layer:
+                raise ValueError("batch has unknown or cyclic input_from references")
+            if len(layer) == 1:
+                results[layer[0]["id"]] = invoke(layer[0])
+            else:
+                if executor is None:
+                    executor = ThreadPoolExecutor(max_workers=len(layer))
+                for call, result in zip(layer, executor.map(invoke, layer)):
+                    results[call["id"]] = result
+            pending = [c for c in pending if c["id"] not in results]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return results[calls[-1]["id"]] if calls else None
+
+
+def _resolve_multi(handler: Callable[[Dict[str, Any]], Dict[str, Any]], requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Run independent requests concurrently, reporting each outcome separately."""
+
+    def invoke(params: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            handler = self.server._handler  # type: ignore[attr-defined]
-            result = handler(data.get("params"))
-            resp = {"id": data.get("id"), "result": result}
+            return {"result": handler(params)}
         except Exception as e:
-            resp = {"id": data.get("id"), "error": str(e)}
+            return {"error": str(e)}
+
+    if len(requests) <= 1:
+        return [invoke(params) for params in requests]
+    with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+        return list(executor.map(invoke, requests))
+
+
+def _select_reply(result: Dict[str, Any], reply_fields: List[str]) -> Dict[str, Any]:
+    """Trim a handler result to the requested fields plus timestamps."""
+    reply = {name: result[name] for name in reply_fields if name in result}
+    if "timestamps" in result:
+        reply["timestamps"] = result["timestamps"]
+    return reply
+
 
-        self.wfile.write((_safe_json_dumps(resp) + "\n").encode("utf-8"))
+class _RPCHandler(socketserver.BaseRequestHandler):
+    """Internal handler that delegates to a provided function."""
+
+    def handle(self):
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        handler = self.server._handler  # type: ignore[attr-defined]
+        # Serve frames until the client closes the connection
+        while True:
+            try:
+                raw = _recv_frame(sock)
+            except OSError:
+                return
+            if raw is None:
+                return
+            dumps, loads = _codec_for(raw)
+            try:
+                data = loads(raw)
+            except Exception as e:
+                resp = {"id": None, "error": f"invalid_payload: {e}"}
+                _send_message(sock, resp, dumps)
+                continue
+
+            # Delegate
+            try:
+                method = data.get("method")
+                if method == "batch":
+                    result = _resolve_batch(handler, data["params"]["calls"])
+                elif method == "multi":
+                    multi_handler = self.server._multi_handler  # type: ignore[attr-defined]
+                    if multi_handler is not None:
+                        result = multi_handler(data["params"]["requests"])
+                    else:
+                        result = _resolve_multi(handler, data["params"]["requests"])
+                else:
+                    params = data.get("params")
+                    reply_fields = params.get("reply_fields") if isinstance(params, dict) else None
+                    result = handler(params)
+                    if reply_fields:
+                        result = _select_reply(result, reply_fields)
+                resp = {"id": data.get("id"), "result": result}
+            except Exception as e:
+                resp = {"id": data.get("id"), "error": str(e)}
+
+            _send_message(sock, resp, dumps)
 
 
 class ThreadedTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
     allow_reuse_address = True
+    # Handler threads block on idle persistent connections; don't let them hold up exit
+    daemon_threads = True
 
 
-def serve(handler_func: Callable[[Dict[str, Any]], Dict[str, Any]], host: str = "0.0.0.0", port: int = 8000):
+def serve(
+    handler_func: Callable[[Dict[str, Any]], Dict[str, Any]],
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    multi_handler: Optional[Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]] = None,
+):
     """Start an RPC server that calls handler_func with params dict and returns dict result.
 
+    multi_handler, if given, serves "multi" requests as a whole and must return one
+    {"result": ...} / {"error": ...} entry per request; by default the requests are
+    passed to handler_func concurrently.
+
     This call blocks the current thread. It runs a threaded server to handle concurrent requests.
     """
     server = ThreadedTCPServer((host, port), _RPCHandler)
-    # Attach handler to server instance for handler to use
+    # Attach handlers to server instance for handler to use
     server._handler = handler_func
+    server._multi_handler = multi_handler
 
     t = threading.Thread(target=server.serve_forever, daemon=True)
     t.start()
     return server
 
 
+# Per-thread pool of open client connections keyed by (host, port)
+_local = threading.local()
+
+
+class RpcConnectError(ConnectionError):
+    """No connection to the server could be opened, so the request was never sent."""
+
+
+def _connect(host: str, port: int, timeout: Optional[float]) -> socket.socket:
+    try:
+        sock = socket.create_connection((host, port), timeout=timeout)
+    except OSError as e:
+        raise RpcConnectError(f"cannot connect to {host}:{port}: {e}") from e
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    return sock
+
+
+def _exchange(sock: socket.socket, frame) -> Optional[bytearray]:
+    sock.sendall(frame)
+    return _recv_frame(sock)
+
+
 def rpc_call(host: str, port: int, params: Dict[str, Any], timeout: Optional[float] = 10.0) -> Dict[str, Any]:
     """Call a remote RPC server and return the parsed response dict.
 
     Raises an exception on error responses or socket issues.
     """
-    req = {"id": "1", "method": "process", "params": params}
-    payload = _safe_json_dumps(req) + "\n"
-    with socket.create_connection((host, port), timeout=timeout) as sock:
-        sock.sendall(payload.encode("utf-8"))
-        # read until newline
-        buf = b""
-        while True:
-            chunk = sock.recv(4096)
-            if not chunk:
-                break
-            buf += chunk
-            if b"\n" in buf:
+    if _batcher is not None:
+        return _batcher.call(host, port, params, timeout)
+    return _request(host, port, "process", params, timeout)
+
+
+def batch_call(host: str, port: int, calls: List[Dict[str, Any]], timeout: Optional[float] = 60.0) -> Dict[str, Any]:
+    """Send a batch of chained calls to one server and return the last call's result.
+
+    See the module docstring for the call format. Raises like `rpc_call`;
+    RpcConnectError means the batch never reached the server.
+    """
+    return _request(host, port, "batch", {"calls": calls}, timeout)
+
+
+def rpc_call_many(
+    targets: List[Tuple[str, int, Dict[str, Any]]],
+    timeout: Optional[float] = 10.0,
+    on_result: Optional[Callable[[int, Any], None]] = None,
+) -> List[Any]:
+    """Call several servers concurrently from the calling thread.
+
+    targets is a list of (host, port, params). Every request is written before any
+    response is read, so the servers work in parallel without a client thread per
+    call, and responses are read in the order they arrive. Returns one entry per
+    target, in order: the result, or the exception that `rpc_call` would have
+    raised. on_result(index, outcome), if given, is called as soon as each outcome
+    is known. Requests bypass the RpcBatcher.
+    """
+    conns = _thread_conns()
+    outcomes: List[Any] = [None] * len(targets)
+
+    def settle(i: int, outcome: Any) -> None:
+        outcomes[i] = outcome
+        if on_result is not None:
+            on_result(i, outcome)
+
+    sent = []
+    for i, (host, port, params) in enumerate(targets):
+        key = (host, port)
+        req = {"id": str(i), "method": "process", "params": params}
+        sock = conns.pop(key, None)
+        fresh = sock is None
+        try:
+            if sock is not None:
+                try:
+                    sock.settimeout(timeout)
+                    sock.sendall(_pack_frame(req, _encode))
+                except (ConnectionResetError, BrokenPipeError):
+                    sock.close()
+                    sock = None
+                    fresh = True
+            if sock is None:
+                sock = _connect(host, port, timeout)
+                sock.sendall(_pack_frame(req, _encode))
+        except Exception as e:
+            if sock is not None:
+                sock.close()
+            settle(i, e)
+            continue
+        sent.append((i, key, sock, fresh))
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with selectors.DefaultSelector() as selector:
+        for entry in sent:
+            selector.register(entry[2], selectors.EVENT_READ, entry)
+        while selector.get_map():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready = selector.select(remaining)
+            if not ready:
+                # Out of time: report every call still waiting, without resending it
+                for selector_key in list(selector.get_map().values()):
+                    i, _, sock, _ = selector_key.data
+                    selector.unregister(sock)
+                    sock.close()
+                    settle(i, socket.timeout("timed out"))
                 break
-        if not buf:
-            raise RuntimeError("no response from server")
-        line, _sep, _rest = buf.partition(b"\n")
-        resp = json.loads(line.decode("utf-8"))
-        if resp.get("error"):
-            raise RuntimeError(resp["error"])
-        return resp.get("result")
+            for selector_key, _ in ready:
+                i, key, sock, fresh = selector_key.data
+                selector.unregister(sock)
+                try:
+                    try:
+                        raw = _recv_frame(sock)
+                    except (ConnectionResetError, BrokenPipeError):
+                        # Only a reset counts as stale; after a timeout the server may
+                        # be running the call, so it is reported rather than resent
+                        if fresh:
+                            raise
+                        raw = None
+                    if raw is None:
+                        sock.close()
+                        if fresh:
+                            raise RuntimeError("no response from server")
+                        # The pooled connection went stale; retry this call on its own
+                        settle(i, _request(key[0], key[1], "process", targets[i][2], timeout))
+                        continue
+                    resp = _codec_for(raw)[1](raw)
+                except Exception as e:
+                    sock.close()
+                    settle(i, e)
+                    continue
+                if key in conns:
+                    # Two targets shared an endpoint; keep one connection
+                    sock.close()
+                else:
+                    conns[key] = sock
+                settle(i, RuntimeError(resp["error"]) if resp.get("error") else resp.get("result"))
+    return outcomes
+
+
+def _thread_conns() -> Dict[Tuple[str, int], socket.socket]:
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    return conns
+
+
+def _request(host: str, port: int, method: str, params: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+    req = {"id": "1", "method": method, "params": params}
+    frame = _pack_frame(req, _encode)
+
+    conns = _thread_conns()
+    key = (host, port)
+    sock = conns.pop(key, None)
+    raw = None
+    try:
+        if sock is not None:
+            try:
+                sock.settimeout(timeout)
+                raw = _exchange(sock, frame)
+            except (ConnectionResetError, BrokenPipeError):
+                # Timeouts and other errors propagate: the server may have the
+                # request already, so resending it could run the call twice
+                raw = None
+            if raw is None:
+                # The pooled connection went stale (EOF or reset, e.g. server restarted); reconnect once
+                sock.close()
+                sock = None
+        if sock is None:
+            sock = _connect(host, port, timeout)
+            raw = _exchange(sock, frame)
+            if raw is None:
+                raise RuntimeError("no response from server")
+    except BaseException:
+        if sock is not None:
+            sock.close()
+        raise
+    conns[key] = sock
+
+    resp = _codec_for(raw)[1](raw)
+    if resp.get("error"):
+        raise RuntimeError(resp["error"])
+    return resp.get("result")
+
+
+class RpcBatcher:
+    """Coalesce concurrent `process` calls to the same server into one frame.
+
+    Each (host, port) gets a sender thread. The first queued request opens a
+    window of `window` seconds (closed early once `max_batch` requests are
+    waiting); everything queued by then goes out as one "multi" request and each
+    caller's future receives its own result or error.
+    """
+
+    def __init__(self, window: float = 0.001, max_batch: int = 32):
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._endpoints: Dict[tuple, "_BatchEndpoint"] = {}
+
+    def submit(self, host: str, port: int, params: Dict[str, Any], timeout: Optional[float] = 10.0) -> Future:
+        key = (host, port)
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            with self._lock:
+                endpoint = self._endpoints.get(key)
+                if endpoint is None:
+                    endpoint = self._endpoints[key] = _BatchEndpoint(self, host, port)
+        future: Future = Future()
+        endpoint.put(params, timeout, future)
+        return future
+
+    def call(self, host: str, port: int, params: Dict[str, Any], timeout: Optional[float] = 10.0) -> Dict[str, Any]:
+        return self.submit(host, port, params, timeout).result()
+
+
+class _BatchEndpoint:
+    """Request queue and sender thread for one server address."""
+
+    def __init__(self, batcher: RpcBatcher, host: str, port: int):
+        self._batcher = batcher
+        self._host = host
+        self._port = port
+        self._queue: collections.deque = collections.deque()
+        self._ready = threading.Condition()
+        threading.Thread(target=self._run, name=f"rpc-batch-{host}:{port}", daemon=True).start()
+
+    def put(self, params: Dict[str, Any], timeout: Optional[float], future: Future) -> None:
+        with self._ready:
+            self._queue.append((params, timeout, future))
+            if len(self._queue) in (1, self._batcher.max_batch):
+                self._ready.notify()
+
+    def _take_batch(self) -> list:
+        max_batch = self._batcher.max_batch
+        with self._ready:
+            while not self._queue:
+                self._ready.wait()
+            deadline = time.monotonic() + self._batcher.window
+            while len(self._queue) < max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._ready.wait(remaining)
+            n = min(len(self._queue), max_batch)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            timeouts = [t for _, t, _ in batch]
+            timeout = None if None in timeouts else max(timeouts)
+            try:
+                if len(batch) == 1:
+                    outcomes = [{"result": _request(self._host, self._port, "process", batch[0][0], timeout)}]
+                else:
+                    requests = [params for params, _, _ in batch]
+                    outcomes = _request(self._host, self._port, "multi", {"requests": requests}, timeout)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), outcome in zip(batch, outcomes):
+                if outcome.get("error"):
+                    future.set_exception(RuntimeError(outcome["error"]))
+                else:
+                    future.set_result(outcome.get("result"))
+
+
+def _batcher_from_env() -> Optional[RpcBatcher]:
+    window_ms = float(os.environ.get("PIPELINE_RPC_BATCH_WINDOW_MS", "0") or 0)
+    return RpcBatcher(window=window_ms / 1000.0) if window_ms > 0 else None
+
+
+# Shared batcher used by rpc_call; None unless PIPELINE_RPC_BATCH_WINDOW_MS is set
+_batcher = _batcher_from_env()
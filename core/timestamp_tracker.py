@@ -1,11 +1,41 @@
 """
 Timestamp tracking and display utilities for pipeline execution.
 """
+import io
+import sys
 import time
-from typing import Dict, Optional
+from typing import Dict, List, Optional, TextIO
 from datetime import datetime
 from core.message import PipelineMessage, TimestampRecord
 
+_PARALLEL_HUB = "service_c_parallel_hub"
+
+# Services in order of execution, split around the parallel hub so the timeline
+# can show the parallel breakdown right after the hub without a per-service check
+_SERVICES_THROUGH_HUB = (
+    "service_a_story_generator",
+    "service_b_story_analyzer",
+    _PARALLEL_HUB,
+)
+_SERVICES_AFTER_HUB = (
+    "service_d_aggregator",
+)
+
+_SERVICE_DISPLAY_NAMES = {
+    "service_a_story_generator": "Service A: Story Generator",
+    "service_b_story_analyzer": "Service B: Story Analyzer",
+    "service_c_parallel_hub": "Service C: Parallel Processing Hub",
+    "service_d_aggregator": "Service D: Final Aggregator",
+}
+
+# (service name, display name) of the services fanned out by the parallel hub
+_PARALLEL_SERVICES = (
+    ("service_c1_image_concept", "Service C1: Image Concept"),
+    ("service_c2_audio_script", "Service C2: Audio Script"),
+    ("service_c3_translation", "Service C3: Translation"),
+    ("service_c4_formatting", "Service C4: Formatting"),
+)
+
 
 class TimestampTracker:
     """Utility class for tracking and displaying service execution times."""
@@ -14,7 +44,7 @@ class TimestampTracker:
     def mark_received(message: PipelineMessage, service_name: str) -> TimestampRecord:
         """Mark when a service receives a request."""
         ts = message.add_timestamp(service_name)
-        ts.received_time = time.time()
+        ts.received_time = time.time_ns()
         return ts
     
     @staticmethod
@@ -22,115 +52,132 @@ class TimestampTracker:
         """Mark when a service starts processing."""
         ts = message.add_timestamp(service_name)
         if not ts.received_time:
-            ts.received_time = time.time()
-        ts.start_time = time.time()
+            ts.received_time = time.time_ns()
+        ts.start_time = time.time_ns()
         return ts
     
+    @staticmethod
+    def mark_all_started(message: PipelineMessage, service_names) -> List[TimestampRecord]:
+        """Mark several services as received and started at the same instant.
+
+        For fan-outs that dispatch every service at once; reads the clock once.
+        Returns the records in service_names order, so the caller can complete
+        each one as its reply arrives (or replace it with the record a remote
+        service reports about itself).
+        """
+        now = time.time_ns()
+        add_timestamp = message.add_timestamp
+        records = []
+        for service_name in service_names:
+            ts = add_timestamp(service_name)
+            ts.received_time = now
+            ts.start_time = now
+            records.append(ts)
+        return records
+
     @staticmethod
     def mark_completed(message: PipelineMessage, service_name: str) -> TimestampRecord:
         """Mark when a service completes processing."""
         ts = message.add_timestamp(service_name)
-        ts.end_time = time.time()
+        ts.set_completed(time.time_ns())
         return ts
     
     @staticmethod
-    def display_service_timestamp(ts: TimestampRecord, indent: int = 0):
-        """Display timestamp information for a single service."""
-        indent_str = "  " * indent
-        
+    def display_service_timestamp(ts: TimestampRecord, indent: int = 0, out: Optional[TextIO] = None):
+        """Display timestamp information for a single service.
+
+        Lines are written to out when given, otherwise collected and written to
+        stdout in a single call.
+        """
         if not ts.start_time:
             return
-            
-        start_str = datetime.fromtimestamp(ts.start_time).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+        buf = io.StringIO() if out is None else out
+        w = buf.write
+        indent_str = "  " * indent
+        start_str = datetime.fromtimestamp(ts.start_time / 1e9).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
         
+        w(f"{indent_str}[{ts.service_name}]\n")
         if ts.received_time:
-            received_str = datetime.fromtimestamp(ts.received_time).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-            print(f"{indent_str}[{ts.service_name}]")
-            print(f"{indent_str}  Received: {received_str}")
-            print(f"{indent_str}  Started: {start_str}")
-        else:
-            print(f"{indent_str}[{ts.service_name}]")
-            print(f"{indent_str}  Started: {start_str}")
+            received_str = datetime.fromtimestamp(ts.received_time / 1e9).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+            w(f"{indent_str}  Received: {received_str}\n")
+        w(f"{indent_str}  Started: {start_str}\n")
             
         if ts.end_time:
-            end_str = datetime.fromtimestamp(ts.end_time).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-            duration_ms = (ts.end_time - ts.start_time) * 1000
-            print(f"{indent_str}  Completed: {end_str}")
-            print(f"{indent_str}  Duration: {duration_ms:.2f}ms")
+            end_str = datetime.fromtimestamp(ts.end_time / 1e9).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+            duration_ms = (ts.end_time - ts.start_time) / 1e6
+            w(f"{indent_str}  Completed: {end_str}\n")
+            w(f"{indent_str}  Duration: {duration_ms:.2f}ms\n")
         else:
-            print(f"{indent_str}  Status: Processing...")
+            w(f"{indent_str}  Status: Processing...\n")
+
+        if out is None:
+            sys.stdout.write(buf.getvalue())
     
     @staticmethod
     def display_pipeline_execution(message: PipelineMessage):
         """Display complete pipeline execution timeline."""
-        print("\n" + "="*60)
-        print("=== Pipeline Execution Timeline ===")
-        print("="*60)
+        out = io.StringIO()
+        w = out.write
+        rule = "=" * 60
+        w(f"\n{rule}\n=== Pipeline Execution Timeline ===\n{rule}\n")
         
+        get_ts = message.timestamps.get
+        display_names = _SERVICE_DISPLAY_NAMES
+        display_service = TimestampTracker.display_service_timestamp
+
         # Display services in order of execution
-        service_order = [
-            "service_a_story_generator",
-            "service_b_story_analyzer",
-            "service_c_parallel_hub",
-            "service_d_aggregator"
-        ]
-        
-        for service_name in service_order:
-            ts = message.get_timestamp(service_name)
-            if ts:
-                service_display_name = {
-                    "service_a_story_generator": "Service A: Story Generator",
-                    "service_b_story_analyzer": "Service B: Story Analyzer",
-                    "service_c_parallel_hub": "Service C: Parallel Processing Hub",
-                    "service_d_aggregator": "Service D: Final Aggregator"
-                }.get(service_name, service_name)
-                
-                print(f"\n[{service_display_name}]")
-                TimestampTracker.display_service_timestamp(ts, indent=1)
+        for service_name in _SERVICES_THROUGH_HUB:
+            ts = get_ts(service_name)
+            if ts is None:
+                continue
+            w(f"\n[{display_names.get(service_name, service_name)}]\n")
+            display_service(ts, indent=1, out=out)
+
+        # Display parallel services under the parallel hub
+        if get_ts(_PARALLEL_HUB) is not None:
+            parallel_timestamps = []
+            for ps_name, ps_display in _PARALLEL_SERVICES:
+                ps_ts = get_ts(ps_name)
+                if ps_ts and ps_ts.start_time:
+                    parallel_timestamps.append((ps_ts, ps_display))
+            
+            if parallel_timestamps:
+                w("\n  [Parallel Services]\n")
+                for ps_ts, ps_display in parallel_timestamps:
+                    start_str = datetime.fromtimestamp(ps_ts.start_time / 1e9).strftime("%H:%M:%S.%f")[:-3]
+                    if ps_ts.end_time:
+                        end_str = datetime.fromtimestamp(ps_ts.end_time / 1e9).strftime("%H:%M:%S.%f")[:-3]
+                        duration_ms = (ps_ts.end_time - ps_ts.start_time) / 1e6
+                        w(f"    [{ps_display}] Started: {start_str}, Completed: {end_str} ({duration_ms:.2f}ms)\n")
+                    else:
+                        w(f"    [{ps_display}] Started: {start_str}, Status: Processing...\n")
                 
-                # Display parallel services if we're at the parallel hub
-                if service_name == "service_c_parallel_hub":
-                    parallel_services = [
-                        ("service_c1_image_concept", "Service C1: Image Concept"),
-                        ("service_c2_audio_script", "Service C2: Audio Script"),
-                        ("service_c3_translation", "Service C3: Translation"),
-                        ("service_c4_formatting", "Service C4: Formatting")
-                    ]
-                    
-                    parallel_timestamps = []
-                    for ps_name, ps_display in parallel_services:
-                        ps_ts = message.get_timestamp(ps_name)
-                        if ps_ts and ps_ts.start_time:
-                            parallel_timestamps.append((ps_ts, ps_display))
-                    
-                    if parallel_timestamps:
-                        print("\n  [Parallel Services]")
-                        for ps_ts, ps_display in parallel_timestamps:
-                            start_str = datetime.fromtimestamp(ps_ts.start_time).strftime("%H:%M:%S.%f")[:-3]
-                            if ps_ts.end_time:
-                                end_str = datetime.fromtimestamp(ps_ts.end_time).strftime("%H:%M:%S.%f")[:-3]
-                                duration_ms = (ps_ts.end_time - ps_ts.start_time) * 1000
-                                print(f"    [{ps_display}] Started: {start_str}, Completed: {end_str} ({duration_ms:.2f}ms)")
-                            else:
-                                print(f"    [{ps_display}] Started: {start_str}, Status: Processing...")
-                        
-                        # Show parallel batch completion
-                        if all(ps_ts.end_time for ps_ts, _ in parallel_timestamps):
-                            max_end = max(ps_ts.end_time for ps_ts, _ in parallel_timestamps)
-                            max_end_str = datetime.fromtimestamp(max_end).strftime("%H:%M:%S.%f")[:-3]
-                            min_start = min(ps_ts.start_time for ps_ts, _ in parallel_timestamps)
-                            max_duration = (max_end - min_start) * 1000
-                            print(f"\n    Parallel Batch Completed: {max_end_str} (max duration: {max_duration:.2f}ms)")
+                # Show parallel batch completion
+                if all(ps_ts.end_time for ps_ts, _ in parallel_timestamps):
+                    max_end = max(ps_ts.end_time for ps_ts, _ in parallel_timestamps)
+                    max_end_str = datetime.fromtimestamp(max_end / 1e9).strftime("%H:%M:%S.%f")[:-3]
+                    min_start = min(ps_ts.start_time for ps_ts, _ in parallel_timestamps)
+                    max_duration = (max_end - min_start) / 1e6
+                    w(f"\n    Parallel Batch Completed: {max_end_str} (max duration: {max_duration:.2f}ms)\n")
+
+        for service_name in _SERVICES_AFTER_HUB:
+            ts = get_ts(service_name)
+            if ts is None:
+                continue
+            w(f"\n[{display_names.get(service_name, service_name)}]\n")
+            display_service(ts, indent=1, out=out)
         
-        # Display total duration
-        if message.timestamps:
-            all_end_times = [ts.end_time for ts in message.timestamps.values() if ts.end_time]
-            all_start_times = [ts.start_time for ts in message.timestamps.values() if ts.start_time]
-            if all_start_times and all_end_times:
-                total_start = min(all_start_times)
-                total_end = max(all_end_times)
-                total_duration_ms = (total_end - total_start) * 1000
-                print(f"\n{'='*60}")
-                print(f"Total Pipeline Duration: {total_duration_ms:.2f}ms")
-                print("="*60 + "\n")
+        # Display total duration (single pass for the earliest start / latest end)
+        total_start = total_end = None
+        for ts in message.timestamps.values():
+            start, end = ts.start_time, ts.end_time
+            if start and (total_start is None or start < total_start):
+                total_start = start
+            if end and (total_end is None or end > total_end):
+                total_end = end
+        if total_start is not None and total_end is not None:
+            total_duration_ms = (total_end - total_start) / 1e6
+            w(f"\n{rule}\nTotal Pipeline Duration: {total_duration_ms:.2f}ms\n{rule}\n\n")
 
+        sys.stdout.write(out.getvalue())
@@ -1,31 +1,72 @@
 """
 Main program entry point for the AI Story Creator Pipeline.
 
-Supports two modes of service communication:
+Supports three modes of service communication:
 - Local mode (default): call Python functions directly in-process
-- RPC mode: call services A/B/C-hub/D over JSON-over-TCP (for Docker Compose)
+- RPC mode: call services A/B/C-hub/D over TCP with length-prefixed MessagePack
+  frames (JSON with PIPELINE_RPC_CODEC=json or when no MessagePack library is
+  installed); see core/rpc.py
+- gRPC mode: call the same services over gRPC (for Docker Compose)
 """
 import sys
 import json
 import time
 import os
-from typing import Callable
-from core.message import PipelineMessage
+from typing import Any, Callable, Dict, Tuple
+from core.message import PipelineMessage, TimestampRecord
 from core.pipeline import Pipeline
 from core.timestamp_tracker import TimestampTracker
 from core import rpc as _rpc
 
+try:
+    import orjson as _orjson
+except ImportError:  # optional; stdlib json is used instead
+    _orjson = None
+
+# PipelineMessage fields a service result overwrites when it sets them
+_MERGE_FIELDS = (
+    "story_text",
+    "analysis",
+    "image_concept",
+    "audio_script",
+    "translations",
+    "formatted_output",
+)
+
+# gRPC clients keyed by (host, port), reused across pipeline runs in this process
+_GRPC_POOL: Dict[Tuple[str, int], Any] = {}
+
+# core.grpc_client.PipelineClient, imported on first use (grpc is only needed in grpc mode)
+_PipelineClient = None
+
+
+def _grpc_client(host: str, port: int):
+    """Return the pooled PipelineClient for host:port, creating it on first use."""
+    global _PipelineClient
+    client = _GRPC_POOL.get((host, port))
+    if client is None:
+        if _PipelineClient is None:
+            from core.grpc_client import PipelineClient as _PipelineClient
+        client = _GRPC_POOL[(host, port)] = _PipelineClient(host, port)
+    return client
+
 
 def main():
-    """Main entry point for the pipeline program."""
-    print("="*70)
-    print(" " * 10 + "AI Story Creator & Multi-Media Enhancement Pipeline")
-    print("="*70)
-    print("\n📋 PROGRAM OVERVIEW:")
-    print("   This program demonstrates a hybrid pipeline-parallel architecture:")
-    print("   • Sequential pipeline: Story Generator → Analyzer → Aggregator")
-    print("   • Parallel processing: Image, Audio, Translation, Formatting (simultaneous)")
-    print("   • Complete timestamp tracking for performance measurement")
+    """Main entry point for the pipeline program.
+
+    The banner and usage notes are skipped when stdout is not a terminal or
+    PIPELINE_QUIET=1 is set (e.g. under Docker Compose or benchmark runs).
+    """
+    quiet = os.environ.get("PIPELINE_QUIET") == "1" or not sys.stdout.isatty()
+    if not quiet:
+        print("="*70)
+        print(" " * 10 + "AI Story Creator & Multi-Media Enhancement Pipeline")
+        print("="*70)
+        print("\n📋 PROGRAM OVERVIEW:")
+        print("   This program demonstrates a hybrid pipeline-parallel architecture:")
+        print("   • Sequential pipeline: Story Generator → Analyzer → Aggregator")
+        print("   • Parallel processing: Image, Audio, Translation, Formatting (simultaneous)")
+        print("   • Complete timestamp tracking for performance measurement")
     # Determine execution mode
     rpc_mode = (os.environ.get("RPC_MODE", "false").lower() == "true") or (
         os.environ.get("PIPELINE_MODE", "").lower() == "rpc"
@@ -34,16 +75,17 @@ def main():
     mode_label = "gRPC (Docker/remote services)" if grpc_mode else ("RPC (Docker/remote services)" if rpc_mode else "LOCAL (Baseline)")
     print("\n🔧 EXECUTION MODE:", mode_label)
     print("="*70)
-    print("\n💡 INSTRUCTIONS:")
-    print("   You can provide a story prompt in two ways:")
-    print("   1. Command line: python main.py \"Your story prompt here\"")
-    print("   2. Interactive: Just run python main.py and enter when prompted")
-    print("\n📝 EXAMPLE PROMPTS:")
-    print("   • \"A space adventure about robots\"")
-    print("   • \"A fantasy tale with dragons and wizards\"")
-    print("   • \"A modern detective story\"")
-    print("   • \"An underwater exploration\"")
-    print("="*70 + "\n")
+    if not quiet:
+        print("\n💡 INSTRUCTIONS:")
+        print("   You can provide a story prompt in two ways:")
+        print("   1. Command line: python main.py \"Your story prompt here\"")
+        print("   2. Interactive: Just run python main.py and enter when prompted")
+        print("\n📝 EXAMPLE PROMPTS:")
+        print("   • \"A space adventure about robots\"")
+        print("   • \"A fantasy tale with dragons and wizards\"")
+        print("   • \"A modern detective story\"")
+        print("   • \"An underwater exploration\"")
+        print("="*70 + "\n")
     
     # Get user input
     if len(sys.argv) > 1:
@@ -87,18 +129,10 @@ def main():
 
     # Helper: merge results from src into dst PipelineMessage (preserve existing timestamps)
     def _merge_message(dst: PipelineMessage, src: PipelineMessage) -> PipelineMessage:
-        if src.story_text is not None:
-            dst.story_text = src.story_text
-        if src.analysis is not None:
-            dst.analysis = src.analysis
-        if src.image_concept is not None:
-            dst.image_concept = src.image_concept
-        if src.audio_script is not None:
-            dst.audio_script = src.audio_script
-        if src.translations is not None:
-            dst.translations = src.translations
-        if src.formatted_output is not None:
-            dst.formatted_output = src.formatted_output
+        for field in _MERGE_FIELDS:
+            value = getattr(src, field)
+            if value is not None:
+                setattr(dst, field, value)
         # Merge metadata (shallow)
         if src.metadata:
             dst.metadata.update(src.metadata)
@@ -108,6 +142,26 @@ def main():
                 dst.timestamps[name] = ts
         return dst
 
+    # Helper: merge a wire-format result dict straight into dst, without building
+    # an intermediate PipelineMessage
+    def _merge_message_from_dict(dst: PipelineMessage, resp: dict) -> PipelineMessage:
+        for field in _MERGE_FIELDS:
+            value = resp.get(field)
+            if value is not None:
+                setattr(dst, field, value)
+        metadata = resp.get("metadata")
+        if metadata:
+            dst.metadata.update(metadata)
+        timestamps = dst.timestamps
+        for name, entry in (resp.get("timestamps") or {}).items():
+            if name not in timestamps:
+                try:
+                    timestamps[name] = TimestampRecord.from_entry(name, entry)
+                except Exception:
+                    # Ignore malformed timestamp entries, as from_dict does
+                    continue
+        return dst
+
     # Helper: build a service function that calls a remote RPC endpoint
     def _rpc_service(name: str, addr: str) -> Callable[[PipelineMessage], PipelineMessage]:
         host, _, port_s = addr.partition(":")
@@ -115,20 +169,46 @@ def main():
 
         def _call(msg: PipelineMessage) -> PipelineMessage:
             # Call remote and merge results into existing message to preserve local tracker marks
-            resp = _rpc.rpc_call(host, port, msg.to_dict())
-            remote = PipelineMessage.from_dict(resp)
-            return _merge_message(msg, remote)
+            resp = _rpc.rpc_call(host, port, msg.to_wire())
+            return _merge_message_from_dict(msg, resp)
 
         _call.__name__ = f"rpc_{name}"
         return _call
 
+    # Helper: run a whole service chain as one batch request to the first service
+    # (at first_addr), which forwards each step to the next service itself. Later
+    # steps are named rather than addressed, so each hop is resolved from the
+    # forwarding service's own network view, not main's.
+    def _rpc_batch(first_addr: str, chain: list) -> Callable[[PipelineMessage], PipelineMessage]:
+        host, _, port_s = first_addr.partition(":")
+        port = int(port_s or "8000")
+
+        def _call(msg: PipelineMessage) -> PipelineMessage:
+            calls = [{"id": chain[0], "params": msg.to_wire()}]
+            calls.extend(
+                {"id": name, "service": name, "input_from": prev_name}
+                for prev_name, name in zip(chain, chain[1:])
+            )
+            sent = time.time_ns()
+            resp = _rpc.batch_call(host, port, calls)
+            done = time.time_ns()
+            msg = _merge_message_from_dict(msg, resp)
+            # Main only sees the batch round trip: each service keeps the record it
+            # reported, and one missing from the reply spans the whole round trip
+            for name in chain:
+                if name not in msg.timestamps:
+                    ts = msg.add_timestamp(name)
+                    ts.received_time = ts.start_time = sent
+                    ts.set_completed(done)
+            return msg
+
+        return _call
+
     # Helper: build a service function that calls a remote gRPC endpoint
     def _grpc_service(name: str, addr: str) -> Callable[[PipelineMessage], PipelineMessage]:
-        from core.grpc_client import PipelineClient
-
         host, _, port_s = addr.partition(":")
         port = int(port_s or "50051")
-        client = PipelineClient(host, port)
+        client = _grpc_client(host, port)
 
         def _call(msg: PipelineMessage) -> PipelineMessage:
             # Call remote and merge results into existing message to preserve local tracker marks
@@ -138,6 +218,7 @@ def main():
         _call.__name__ = f"grpc_{name}"
         return _call
 
+    batch_pipeline = None
     if grpc_mode or rpc_mode:
         # Resolve service addresses based on docker-compose defaults or env
         addr_a = _addr_for("SERVICE_A", "service-a", 50051)
@@ -154,6 +235,17 @@ def main():
             pipeline.register_service("service_b_story_analyzer", _rpc_service("service_b", addr_b))
             pipeline.register_service("service_c_parallel_hub", _rpc_service("service_c", addr_c))
             pipeline.register_service("service_d_aggregator", _rpc_service("service_d", addr_d))
+            # Opt-in (PIPELINE_RPC_BATCH=1): send the whole chain to service A as a
+            # single round trip. Service A then reaches B, C and D through its own
+            # SERVICE_B_ADDR / SERVICE_B_HOST / ... settings (docker-compose names by
+            # default). The per-service registrations above remain the fallback.
+            if os.environ.get("PIPELINE_RPC_BATCH") == "1":
+                batch_pipeline = _rpc_batch(addr_a, [
+                    "service_a_story_generator",
+                    "service_b_story_analyzer",
+                    "service_c_parallel_hub",
+                    "service_d_aggregator",
+                ])
     else:
         from services.service_a_story_generator import service_a
         from services.service_b_story_analyzer import service_b
@@ -179,54 +271,67 @@ def main():
         tracker = TimestampTracker()
         tracker.mark_started(message, "main_program")
         
-        final_message = pipeline.execute_pipeline(message, service_chain)
+        final_message = None
+        if batch_pipeline is not None:
+            try:
+                final_message = batch_pipeline(message)
+            except _rpc.RpcConnectError as e:
+                # Only fall back when the batch never left: after a timeout or a
+                # server error the services may already have run
+                print(f"⚠️  Batched RPC failed ({e}); calling services one by one")
+        if final_message is None:
+            final_message = pipeline.execute_pipeline(message, service_chain)
         
         tracker.mark_completed(final_message, "main_program")
         
         # Display execution timeline
         tracker.display_pipeline_execution(final_message)
         
-        # Display results summary
-        print("\n" + "="*60)
-        print("Results Summary")
-        print("="*60)
+        # Display results summary (collected and written in one call)
+        out = []
+        w = out.append
+        w("\n" + "="*60)
+        w("Results Summary")
+        w("="*60)
         
         if final_message.story_text:
-            print(f"\n📖 Generated Story ({len(final_message.story_text.split())} words):")
-            print("-" * 60)
+            w(f"\n📖 Generated Story ({len(final_message.story_text.split())} words):")
+            w("-" * 60)
             # Show first 300 characters
             story_preview = final_message.story_text[:300]
             if len(final_message.story_text) > 300:
                 story_preview += "..."
-            print(story_preview)
+            w(story_preview)
         
         if final_message.analysis:
-            print(f"\n📊 Analysis:")
-            print(f"  - Sentiment: {final_message.analysis.get('sentiment', 'N/A')}")
-            print(f"  - Keywords: {', '.join(final_message.analysis.get('keywords', [])[:5])}")
+            w(f"\n📊 Analysis:")
+            w(f"  - Sentiment: {final_message.analysis.get('sentiment', 'N/A')}")
+            w(f"  - Keywords: {', '.join(final_message.analysis.get('keywords', [])[:5])}")
             if final_message.analysis.get('characters'):
-                print(f"  - Characters: {', '.join(final_message.analysis.get('characters', []))}")
+                w(f"  - Characters: {', '.join(final_message.analysis.get('characters', []))}")
         
         if final_message.image_concept:
-            print(f"\n🎨 Image Concept:")
-            print(f"  - Scene: {final_message.image_concept.get('scene_description', 'N/A')}")
-            print(f"  - Mood: {final_message.image_concept.get('mood', 'N/A')}")
-            print(f"  - Colors: {', '.join(final_message.image_concept.get('color_palette', []))}")
+            w(f"\n🎨 Image Concept:")
+            w(f"  - Scene: {final_message.image_concept.get('scene_description', 'N/A')}")
+            w(f"  - Mood: {final_message.image_concept.get('mood', 'N/A')}")
+            w(f"  - Colors: {', '.join(final_message.image_concept.get('color_palette', []))}")
         
         if final_message.audio_script:
-            print(f"\n🎙️ Audio Script:")
-            print(f"  - Estimated Duration: {final_message.audio_script.get('duration_estimate_minutes', 0)} minutes")
-            print(f"  - Tone: {final_message.audio_script.get('tone', 'N/A')}")
+            w(f"\n🎙️ Audio Script:")
+            w(f"  - Estimated Duration: {final_message.audio_script.get('duration_estimate_minutes', 0)} minutes")
+            w(f"  - Tone: {final_message.audio_script.get('tone', 'N/A')}")
         
         if final_message.translations:
-            print(f"\n🌐 Translations Available:")
+            w(f"\n🌐 Translations Available:")
             for lang in final_message.translations.keys():
-                print(f"  - {lang.capitalize()}")
+                w(f"  - {lang.capitalize()}")
         
         if final_message.formatted_output:
-            print(f"\n📄 Formatted Outputs Available:")
+            w(f"\n📄 Formatted Outputs Available:")
             for fmt in final_message.formatted_output.keys():
-                print(f"  - {fmt.upper()}")
+                w(f"  - {fmt.upper()}")
+        
+        sys.stdout.write("\n".join(out) + "\n")
         
         # Optionally save full output to JSON (resolve path relative to this file)
         base_dir = os.path.dirname(__file__)
@@ -242,8 +347,20 @@ def main():
         output_payload["execution_mode"] = "grpc" if grpc_mode else ("rpc" if rpc_mode else "local")
         # Also mirror into metadata for consumers that only read metadata
         final_message.metadata["execution_mode"] = output_payload["execution_mode"]
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(output_payload, f, indent=2, ensure_ascii=False)
+        if _orjson is not None:
+            output_bytes = _orjson.dumps(output_payload, option=_orjson.OPT_INDENT_2 | _orjson.OPT_NON_STR_KEYS)
+        else:
+            output_bytes = json.dumps(output_payload, indent=2, ensure_ascii=False).encode('utf-8')
+        # Write to a temporary file and swap it in, so readers never see a partial file
+        tmp_file = f"{output_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(output_bytes)
+            os.replace(tmp_file, output_file)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
         print(f"\n💾 Full output saved to: {output_file}")
         
         print("\n" + "="*60)
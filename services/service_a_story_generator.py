@@ -1,8 +1,12 @@
 """
 Service A: Story Generator Service
 Generates a creative story based on user prompt.
+
+Set ARTIFICIAL_DELAY=1 to run the simulated workload (prompt scoring, the
+variant/refinement loops and validation counting), whose results are never used.
 """
 import time
+from collections import Counter
 from core.message import PipelineMessage
 from utils.story_generator import StoryGenerator
 import os
@@ -11,6 +15,27 @@ import threading
 from core import rpc as _rpc
 from core.timestamp_tracker import TimestampTracker as _TimestampTracker
 
+try:
+    import numpy as np
+except ImportError:  # optional; a pure-Python fallback is used
+    np = None
+
+# TimestampTracker's methods only touch the message passed in, so one instance serves
+# every request thread
+_TRACKER = _TimestampTracker()
+
+# Run the simulated workload (prompt scoring, phases 2-4); off by default
+_ARTIFICIAL_DELAY = os.environ.get("ARTIFICIAL_DELAY", "0") == "1"
+
+
+def _theme_score(text: str) -> int:
+    """Sum of ord(c) % 10 over every character of text."""
+    if np is not None:
+        # UTF-32 gives one code point per element, so this matches ord() exactly
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        return int((codes % 10).sum())
+    return sum((ord(c) % 10) * n for c, n in Counter(text).items())
+
 
 def process_service_a(message: PipelineMessage) -> PipelineMessage:
     """
@@ -29,43 +54,41 @@ def process_service_a(message: PipelineMessage) -> PipelineMessage:
     prompt_words = message.user_input.split()
     word_count = len(prompt_words)
     
-    # Simulate prompt analysis with loops
-    theme_score = 0
-    for word in prompt_words:
-        # Simple scoring computation
-        for char in word.lower():
-            theme_score += ord(char) % 10
+    # Simulate prompt analysis (character scoring over the prompt words); the score
+    # feeds nothing, so like the phase 2/3 loops it only runs when requested
+    if _ARTIFICIAL_DELAY:
+        _ = _theme_score("".join(prompt_words).lower())
     
     # Phase 2: Generate multiple story variants (simulated)
+    # Phase 3: Select and refine best variant (simulated)
+    # The loops only burn CPU (their sums are constants: 328350 and
+    # variant_count * pass_num * 1225), so they run only when requested.
     variant_count = max(3, word_count // 2)
-    for variant in range(variant_count):
-        # Simulate variant generation with computation
-        _ = sum(i * i for i in range(100))  # Simulate processing work
-    
-    # Phase 3: Select and refine best variant
-    # Simulate refinement process
     refinement_passes = 3
-    for pass_num in range(refinement_passes):
-        # Simulate refinement computations
-        _ = sum(i * variant_count * pass_num for i in range(50))
+    if _ARTIFICIAL_DELAY:
+        for variant in range(variant_count):
+            _ = sum(i * i for i in range(100))
+        for pass_num in range(refinement_passes):
+            _ = sum(i * variant_count * pass_num for i in range(50))
     
     # Generate actual story
     story_data = StoryGenerator.generate_with_characters(message.user_input)
     
     # Phase 4: Post-processing (word count validation, structure check)
     story_words = story_data["text"].split()
-    # Simulate validation loops
+    # Every validation pass produced the same counts, so they are counted once; the
+    # counts are never read, so this too only runs under ARTIFICIAL_DELAY
     validation_checks = 5
-    for check in range(validation_checks):
-        # Count words multiple times (simulating validation)
-        word_freq = {}
-        for word in story_words:
-            word_freq[word.lower()] = word_freq.get(word.lower(), 0) + 1
+    if _ARTIFICIAL_DELAY:
+        _ = Counter(story_data["text"].lower().split())
     
     # Update message
     message.story_text = story_data["text"]
     message.metadata["characters"] = story_data["characters"]
     message.metadata["theme"] = story_data["theme"]
+    # In-process only: lets service B reuse the tokens instead of re-splitting the
+    # story. The RPC/gRPC handlers drop it before the message leaves this process.
+    message.metadata["_story_words"] = (message.story_text, story_words)
     message.metadata["generation_metadata"] = {
         "variants_generated": variant_count,
         "refinement_passes": refinement_passes,
@@ -82,16 +105,17 @@ service_a = process_service_a
 def _rpc_handler(params: dict) -> dict:
     """RPC handler wrapper for this service.
 
-    Expects params to be a PipelineMessage-like dict. Returns message.to_dict().
+    Expects params to be a PipelineMessage-like dict. Returns message.to_wire().
     """
     pm = PipelineMessage.from_dict(params)
-    tracker = _TimestampTracker()
+    tracker = _TRACKER
     tracker.mark_received(pm, "service_a_story_generator")
     tracker.mark_started(pm, "service_a_story_generator")
     try:
         result = process_service_a(pm)
+        result.metadata.pop("_story_words", None)
         tracker.mark_completed(result, "service_a_story_generator")
-        return result.to_dict()
+        return result.to_wire()
     except Exception as e:
         tracker.mark_completed(pm, "service_a_story_generator")
         raise
@@ -107,11 +131,12 @@ if __name__ == "__main__":
 
         print(f"Starting gRPC server for service_a on {host}:{port}")
         def _grpc_handler(pm: PipelineMessage) -> PipelineMessage:
-            tracker = _TimestampTracker()
+            tracker = _TRACKER
             tracker.mark_received(pm, "service_a_story_generator")
             tracker.mark_started(pm, "service_a_story_generator")
             try:
                 result = process_service_a(pm)
+                result.metadata.pop("_story_words", None)
                 tracker.mark_completed(result, "service_a_story_generator")
                 return result
             except Exception:
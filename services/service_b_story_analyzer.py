@@ -1,89 +1,158 @@
 """
 Service B: Story Analyzer Service
 Analyzes the generated story for sentiment, keywords, and statistics.
+
+Set ARTIFICIAL_DELAY=1 to run the simulated workload (the regex sentiment
+scoring and keyword ranking), whose results are never used.
 """
+import functools
+import re
 import time
+from collections import Counter
 from core.message import PipelineMessage
 from utils.text_analyzer import TextAnalyzer
+from utils import analysis_kernel as _kernel
 import os
 import json
 import threading
+from typing import List, Optional
 from core import rpc as _rpc
 from core.timestamp_tracker import TimestampTracker as _TimestampTracker
 
+_TRACKER = _TimestampTracker()
+
+try:
+    import numpy as np
+except ImportError:  # optional; a pure-Python fallback is used
+    np = None
+
+# Run the simulated workload (phases 4 and 5 scoring); off by default
+_ARTIFICIAL_DELAY = os.environ.get("ARTIFICIAL_DELAY", "0") == "1"
+
+# One match per whitespace-delimited word containing any of the terms
+_POSITIVE_WORD_RE = re.compile(r"\S*(?:happy|joy|love|great)\S*")
+_NEGATIVE_WORD_RE = re.compile(r"\S*(?:sad|fear|dark|lost)\S*")
+
+
+@functools.lru_cache(maxsize=128)
+def _cached_analyze(story_text: str, known_characters: tuple) -> dict:
+    """TextAnalyzer.analyze memoized per (story, known characters); callers must copy."""
+    return TextAnalyzer.analyze(story_text, list(known_characters))
+
+
+def _analyze(story_text: str, known_characters) -> dict:
+    """Return a fresh TextAnalyzer.analyze result, reusing cached work for repeated stories."""
+    try:
+        cached = _cached_analyze(story_text, tuple(known_characters or ()))
+    except TypeError:  # unhashable character entries
+        return TextAnalyzer.analyze(story_text, known_characters)
+    # The caller adds keys to the dict, so hand out a copy (lists included)
+    return {k: v.copy() if isinstance(v, list) else v for k, v in cached.items()}
+
+
+_ASCII_LETTER_CODES = [i for i in range(128) if chr(i).isalpha()]
+
+
+def _letter_counts(text: str) -> dict:
+    """Occurrences of each alphabetic character in text."""
+    if np is not None:
+        if text.isascii():
+            # One linear bincount over the bytes; ASCII letters are exactly a-z/A-Z
+            counts = np.bincount(np.frombuffer(text.encode("ascii"), dtype=np.uint8), minlength=128)
+            return {chr(i): int(counts[i]) for i in _ASCII_LETTER_CODES if counts[i]}
+        # Histogram the UTF-32 code points, then test only the distinct ones
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        uniques, counts = np.unique(codes, return_counts=True)
+        chars = map(chr, uniques.tolist())
+        return {c: n for c, n in zip(chars, counts.tolist()) if c.isalpha()}
+    return {c: n for c, n in Counter(text).items() if c.isalpha()}
+
 
-def process_service_b(message: PipelineMessage) -> PipelineMessage:
+def _batch_letter_counts(lower_texts: List[str]) -> List[dict]:
+    """_letter_counts for several texts; all ASCII texts share one bincount."""
+    results = [None] * len(lower_texts)
+    if np is not None:
+        ascii_ids = [i for i, text in enumerate(lower_texts) if text.isascii()]
+        if ascii_ids:
+            joined = "".join(lower_texts[i] for i in ascii_ids).encode("ascii")
+            codes = np.frombuffer(joined, dtype=np.uint8).astype(np.int64)
+            owners = np.repeat(np.arange(len(ascii_ids)), [len(lower_texts[i]) for i in ascii_ids])
+            # Row k of the (texts x 128) histogram belongs to text ascii_ids[k]
+            hist = np.bincount(owners * 128 + codes, minlength=len(ascii_ids) * 128).reshape(-1, 128)
+            letters = [chr(c) for c in _ASCII_LETTER_CODES]
+            for i, row in zip(ascii_ids, hist[:, _ASCII_LETTER_CODES].tolist()):
+                results[i] = {c: n for c, n in zip(letters, row) if n}
+    return [counts if counts is not None else _letter_counts(text)
+            for counts, text in zip(results, lower_texts)]
+
+
+def process_service_b(message: PipelineMessage, letter_counts: Optional[dict] = None) -> PipelineMessage:
     """
     Analyze the story from Service A with comprehensive processing.
     
     Args:
         message: Pipeline message with story_text
+        letter_counts: Precomputed letter histogram of the lowercased story
+            (used by process_service_b_batch)
         
     Returns:
         Updated message with analysis data
     """
+    # Tokens handed over by service A when both run in-process
+    cached_words = message.metadata.pop("_story_words", None)
     if not message.story_text:
         raise ValueError("Story text required for analysis")
     
     story_text = message.story_text
-    words = story_text.split()
+    if cached_words is not None and cached_words[0] is story_text:
+        words = cached_words[1]
+    else:
+        words = story_text.split()
+    # Lowercase once; every phase below works on these copies
+    lower_text = story_text.lower()
+    lower_words = lower_text.split()
     
     # Phase 1: Multi-pass text processing
     # First pass: Word frequency analysis
-    word_frequency = {}
-    for word in words:
-        clean_word = word.lower().strip('.,!?;:()[]{}"\'').strip()
-        if len(clean_word) > 0:
-            word_frequency[clean_word] = word_frequency.get(clean_word, 0) + 1
+    word_frequency = _kernel.word_frequency(lower_words)
     
     # Second pass: Character analysis with loops
-    character_count = {}
-    for char in story_text.lower():
-        if char.isalpha():
-            character_count[char] = character_count.get(char, 0) + 1
+    character_count = letter_counts if letter_counts is not None else _letter_counts(lower_text)
     
     # Phase 2: Statistical computations
     # Calculate various statistics
-    total_chars = sum(len(word) for word in words)
+    total_chars = _kernel.total_length(words)
     avg_word_length = total_chars / len(words) if words else 0
     
-    # Phase 3: Pattern detection (simulated with loops)
+    # Phase 3: Pattern detection (simulated)
+    # Every search term "pattern<N>" is matched on its first three letters, so all
+    # patterns match exactly when some word contains "pat"
     pattern_searches = 10
-    patterns_found = []
-    for pattern_id in range(pattern_searches):
-        # Simulate pattern matching
-        matches = 0
-        search_term = f"pattern{pattern_id}"
-        for word in words:
-            if search_term[:3] in word.lower():
-                matches += 1
-        if matches > 0:
-            patterns_found.append(f"pattern_{pattern_id}")
+    if "pat" in lower_text:
+        patterns_found = [f"pattern_{pattern_id}" for pattern_id in range(pattern_searches)]
+    else:
+        patterns_found = []
     
     # Phase 4: Sentiment analysis (multiple passes)
+    # Each pass yields the same score, so compute it once; the scores are never
+    # read, so this only runs under ARTIFICIAL_DELAY
     sentiment_passes = 3
-    sentiment_scores = []
-    for pass_num in range(sentiment_passes):
-        # Simulate sentiment calculation
-        positive_count = sum(1 for word in words if any(p in word.lower() for p in ['happy', 'joy', 'love', 'great']))
-        negative_count = sum(1 for word in words if any(n in word.lower() for n in ['sad', 'fear', 'dark', 'lost']))
+    if _ARTIFICIAL_DELAY:
+        positive_count = len(_POSITIVE_WORD_RE.findall(lower_text))
+        negative_count = len(_NEGATIVE_WORD_RE.findall(lower_text))
         score = (positive_count - negative_count) / max(len(words), 1)
-        sentiment_scores.append(score)
+        _ = [score] * sentiment_passes
     
     # Phase 5: Keyword extraction with ranking
-    # Calculate TF-like scores (simplified)
-    keyword_scores = {}
-    for word, freq in word_frequency.items():
-        if len(word) > 3:  # Filter short words
-            # Simple scoring
-            score = freq * len(word)
-            keyword_scores[word] = score
+    # Calculate TF-like scores (simplified); unused, like the phase 4 scores
+    if _ARTIFICIAL_DELAY:
+        _ = _kernel.keyword_scores(word_frequency)
     
     # Get known characters from metadata if available
     known_characters = message.metadata.get("characters", [])
     
     # Perform standard analysis (calls the utility)
-    analysis = TextAnalyzer.analyze(story_text, known_characters)
+    analysis = _analyze(story_text, known_characters)
     
     # Enhance with computed statistics
     analysis["processing_metadata"] = {
@@ -101,22 +170,68 @@ def process_service_b(message: PipelineMessage) -> PipelineMessage:
     return message
 
 
+def process_service_b_batch(messages: List[PipelineMessage]) -> List[PipelineMessage]:
+    """
+    Analyze several stories at once.
+    
+    The letter histograms of all stories are computed together; everything else
+    runs per story as in process_service_b.
+    """
+    histograms = _batch_letter_counts([(m.story_text or "").lower() for m in messages])
+    return [process_service_b(m, letter_counts=h) for m, h in zip(messages, histograms)]
+
+
 # Service function for pipeline
 service_b = process_service_b
 
 
-def _rpc_handler(params: dict) -> dict:
-    pm = PipelineMessage.from_dict(params)
-    tracker = _TimestampTracker()
-    tracker.mark_received(pm, "service_b_story_analyzer")
-    tracker.mark_started(pm, "service_b_story_analyzer")
+def _rpc_handler(params: dict, letter_counts: Optional[dict] = None) -> dict:
+    """RPC handler working directly on the wire dict.
+
+    Service B only reads story_text and metadata and only adds analysis and its
+    own timestamp, so those are patched into params and everything else passes
+    through without a PipelineMessage round trip.
+    """
+    if "story_text" not in params and "story" in params:
+        # to_dict() form; normalise it to the wire form first
+        params = PipelineMessage.from_dict(params).to_wire()
+    metadata = params.get("metadata") or {}
+    pm = PipelineMessage(
+        user_input=params.get("user_input", ""),
+        story_text=params.get("story_text"),
+        metadata=metadata,
+    )
+    _TRACKER.mark_received(pm, "service_b_story_analyzer")
+    _TRACKER.mark_started(pm, "service_b_story_analyzer")
     try:
-        result = process_service_b(pm)
-        tracker.mark_completed(result, "service_b_story_analyzer")
-        return result.to_dict()
+        result = process_service_b(pm, letter_counts=letter_counts)
+        ts = _TRACKER.mark_completed(result, "service_b_story_analyzer")
     except Exception:
-        tracker.mark_completed(pm, "service_b_story_analyzer")
+        _TRACKER.mark_completed(pm, "service_b_story_analyzer")
         raise
+    params["analysis"] = result.analysis
+    if metadata:
+        params["metadata"] = metadata
+    timestamps = params.get("timestamps") or {}
+    timestamps["service_b_story_analyzer"] = ts.to_wire()
+    params["timestamps"] = timestamps
+    return params
+
+
+def _rpc_multi_handler(requests: List[dict]) -> List[dict]:
+    """RPC "multi" handler: analyze all queued stories with one batched histogram pass."""
+    requests = [
+        PipelineMessage.from_dict(p).to_wire() if "story_text" not in p and "story" in p else p
+        for p in requests
+    ]
+    histograms = _batch_letter_counts([(p.get("story_text") or "").lower() for p in requests])
+    outcomes = []
+    for params, counts in zip(requests, histograms):
+        try:
+            outcomes.append({"result": _rpc_handler(params, letter_counts=counts)})
+        except Exception as e:
+            outcomes.append({"error": str(e)})
+    return outcomes
 
 
 if __name__ == "__main__":
@@ -128,21 +243,20 @@ if __name__ == "__main__":
         
         print(f"Starting gRPC server for service_b on {host}:{port}")
         def _grpc_handler(pm: PipelineMessage) -> PipelineMessage:
-            tracker = _TimestampTracker()
-            tracker.mark_received(pm, "service_b_story_analyzer")
-            tracker.mark_started(pm, "service_b_story_analyzer")
+            _TRACKER.mark_received(pm, "service_b_story_analyzer")
+            _TRACKER.mark_started(pm, "service_b_story_analyzer")
             try:
                 result = process_service_b(pm)
-                tracker.mark_completed(result, "service_b_story_analyzer")
+                _TRACKER.mark_completed(result, "service_b_story_analyzer")
                 return result
             except Exception:
-                tracker.mark_completed(pm, "service_b_story_analyzer")
+                _TRACKER.mark_completed(pm, "service_b_story_analyzer")
                 raise
 
         server = _grpc_server.serve(_grpc_handler, host=host, port=port)
     else:
         print(f"Starting RPC server for service_b on {host}:{port}")
-        server = _rpc.serve(_rpc_handler, host=host, port=port)
+        server = _rpc.serve(_rpc_handler, host=host, port=port, multi_handler=_rpc_multi_handler)
     try:
         threading.Event().wait()
     except KeyboardInterrupt:
@@ -2,7 +2,6 @@
 Service C1: Image Concept Generator Service
 Creates visual concept descriptions based on the story.
 """
-import time
 import random
 from core.message import PipelineMessage
 import os
@@ -11,6 +10,49 @@ import threading
 from core import rpc as _rpc
 from core.timestamp_tracker import TimestampTracker as _TimestampTracker
 
+_TRACKER = _TimestampTracker()
+
+_COLOR_PALETTES = {
+    "positive": ["bright blue", "golden yellow", "emerald green", "sky blue", "sunset orange"],
+    "negative": ["deep purple", "dark gray", "crimson red", "midnight blue", "storm gray"],
+    "neutral": ["silver", "steel blue", "charcoal", "ocean blue", "mist gray"]
+}
+
+_STYLE_OPTIONS = ["digital art", "fantasy illustration", "realistic painting", "abstract design"]
+
+
+def _color_score(color: str) -> int:
+    """Simulated color compatibility score."""
+    return sum(ord(c) for c in color) % 100
+
+
+def _style_score(style: str) -> int:
+    """Simulated style compatibility score."""
+    return sum(ord(c) % 50 for c in style)
+
+
+# The simulated scores depend only on these constant strings, so the top three
+# colors per palette and the selected style are fixed; rank them once at import.
+# sorted() is stable, so ties keep palette order as the per-call ranking did.
+_TOP_COLORS = {
+    sentiment: sorted(palette, key=_color_score, reverse=True)[:3]
+    for sentiment, palette in _COLOR_PALETTES.items()
+}
+_SELECTED_STYLE = max(_STYLE_OPTIONS, key=_style_score)
+
+_SCENES = {
+    "space": ["futuristic space station", "distant planet surface", "cosmic nebula", "asteroid field"],
+    "fantasy": ["enchanted forest", "mystical castle", "magical realm", "ancient ruins"],
+    "modern": ["urban cityscape", "coastal town", "mountain vista", "tech hub"],
+    "robots": ["futuristic factory", "smart city", "research laboratory", "cyber space"]
+}
+
+# (scene, lowercased scene) pairs, so scoring doesn't lower the scene per keyword
+_SCENES_LOWER = {
+    theme: [(scene, scene.lower()) for scene in scenes]
+    for theme, scenes in _SCENES.items()
+}
+
 
 def process_service_c1(message: PipelineMessage) -> PipelineMessage:
     """
@@ -28,80 +70,35 @@ def process_service_c1(message: PipelineMessage) -> PipelineMessage:
     keywords = analysis.get("keywords", [])
     
     # Phase 1: Visual element extraction with loops
-    visual_elements = []
     story_words = story.split()
-    element_count = 0
-    for word in story_words:
-        # Simulate visual element detection
-        if len(word) > 4:
-            element_count += 1
-            # Simulate processing
-            _ = sum(ord(c) for c in word.lower()) % 100
+    # Simulate visual element detection (words longer than 4 characters)
+    element_count = sum(1 for word in story_words if len(word) > 4)
     
-    # Phase 2: Color analysis (multiple iterations)
+    # Phase 2: Color analysis (ranked once at import, see _TOP_COLORS)
     color_analysis_iterations = 15
-    color_scores = {}
     sentiment = analysis.get("sentiment", "neutral")
-    
-    color_palettes = {
-        "positive": ["bright blue", "golden yellow", "emerald green", "sky blue", "sunset orange"],
-        "negative": ["deep purple", "dark gray", "crimson red", "midnight blue", "storm gray"],
-        "neutral": ["silver", "steel blue", "charcoal", "ocean blue", "mist gray"]
-    }
-    
-    available_colors = color_palettes.get(sentiment, color_palettes["neutral"])
-    
-    # Simulate color scoring for each color
-    for iteration in range(color_analysis_iterations):
-        for color in available_colors:
-            # Simulate color compatibility scoring
-            score = sum(ord(c) for c in color) % 100
-            color_scores[color] = color_scores.get(color, 0) + score
-    
-    # Select top colors based on scores
-    sorted_colors = sorted(color_scores.items(), key=lambda x: x[1], reverse=True)
-    colors = [color for color, _ in sorted_colors[:3]]
+    colors = list(_TOP_COLORS.get(sentiment, _TOP_COLORS["neutral"]))
     
     # Phase 3: Scene composition generation
-    scenes = {
-        "space": ["futuristic space station", "distant planet surface", "cosmic nebula", "asteroid field"],
-        "fantasy": ["enchanted forest", "mystical castle", "magical realm", "ancient ruins"],
-        "modern": ["urban cityscape", "coastal town", "mountain vista", "tech hub"],
-        "robots": ["futuristic factory", "smart city", "research laboratory", "cyber space"]
-    }
-    
-    # Simulate scene selection process
-    scene_candidates = scenes.get(theme, scenes["fantasy"])
+    # Simulate scene selection process: 10 points per keyword found in the scene
+    scene_candidates = _SCENES_LOWER.get(theme, _SCENES_LOWER["fantasy"])
+    lower_keywords = [word.lower() for word in keywords]
     scene_scores = {}
-    for scene in scene_candidates:
-        # Simulate scoring
-        for word in keywords:
-            if word.lower() in scene.lower():
-                scene_scores[scene] = scene_scores.get(scene, 0) + 10
-    
-    scene = max(scene_scores.items(), key=lambda x: x[1])[0] if scene_scores else random.choice(scene_candidates)
+    for scene, scene_lower in scene_candidates:
+        hits = sum(1 for word in lower_keywords if word in scene_lower)
+        if hits:
+            scene_scores[scene] = hits * 10
     
-    # Phase 4: Mood calculation with multiple factors
-    mood_factors = []
-    for factor in range(5):
-        # Simulate mood factor calculation
-        factor_score = sum(i * factor for i in range(20))
-        mood_factors.append(factor_score)
+    if scene_scores:
+        scene = max(scene_scores.items(), key=lambda x: x[1])[0]
+    else:
+        scene = random.choice(scene_candidates)[0]
     
-    avg_mood_score = sum(mood_factors) / len(mood_factors) if mood_factors else 50
+    # Phase 4: Mood selection
     mood = "hopeful adventure" if sentiment == "positive" else "mysterious journey" if sentiment == "negative" else "contemplative exploration"
     
-    # Phase 5: Style determination with processing
-    style_options = ["digital art", "fantasy illustration", "realistic painting", "abstract design"]
-    style_scores = {}
-    for style in style_options:
-        # Simulate style compatibility check
-        compatibility = 0
-        for char in style:
-            compatibility += ord(char) % 50
-        style_scores[style] = compatibility
-    
-    selected_style = max(style_scores.items(), key=lambda x: x[1])[0] if style_scores else "digital art"
+    # Phase 5: Style determination (fixed, see _SELECTED_STYLE)
+    selected_style = _SELECTED_STYLE
     
     image_concept = {
         "scene_description": scene,
@@ -124,15 +121,14 @@ service_c1 = process_service_c1
 
 def _rpc_handler(params: dict) -> dict:
     pm = PipelineMessage.from_dict(params)
-    tracker = _TimestampTracker()
-    tracker.mark_received(pm, "service_c1_image_concept")
-    tracker.mark_started(pm, "service_c1_image_concept")
+    _TRACKER.mark_received(pm, "service_c1_image_concept")
+    _TRACKER.mark_started(pm, "service_c1_image_concept")
     try:
         result = process_service_c1(pm)
-        tracker.mark_completed(result, "service_c1_image_concept")
-        return result.to_dict()
+        _TRACKER.mark_completed(result, "service_c1_image_concept")
+        return result.to_wire()
     except Exception:
-        tracker.mark_completed(pm, "service_c1_image_concept")
+        _TRACKER.mark_completed(pm, "service_c1_image_concept")
         raise
 
 
@@ -145,15 +141,14 @@ if __name__ == "__main__":
 
         print(f"Starting gRPC server for service_c1 on {host}:{port}")
         def _grpc_handler(pm: PipelineMessage) -> PipelineMessage:
-            tracker = _TimestampTracker()
-            tracker.mark_received(pm, "service_c1_image_concept")
-            tracker.mark_started(pm, "service_c1_image_concept")
+            _TRACKER.mark_received(pm, "service_c1_image_concept")
+            _TRACKER.mark_started(pm, "service_c1_image_concept")
             try:
                 result = process_service_c1(pm)
-                tracker.mark_completed(result, "service_c1_image_concept")
+                _TRACKER.mark_completed(result, "service_c1_image_concept")
                 return result
             except Exception:
-                tracker.mark_completed(pm, "service_c1_image_concept")
+                _TRACKER.mark_completed(pm, "service_c1_image_concept")
                 raise
 
         server = _grpc_server.serve(_grpc_handler, host=host, port=port)
@@ -2,8 +2,7 @@
 Service C2: Audio Script Service
 Creates narration script with dramatic pauses and emphasis markers.
 """
-import time
-import random
+import re
 from core.message import PipelineMessage
 import os
 import json
@@ -11,6 +10,18 @@ import threading
 from core import rpc as _rpc
 from core.timestamp_tracker import TimestampTracker as _TimestampTracker
 
+_TRACKER = _TimestampTracker()
+
+# Simulated narration speed in words per minute
+_READING_SPEED_WPM = 140.0
+
+# One match per whitespace-delimited word containing any of the terms
+_IMPORTANT_WORD_RE = re.compile(r"\S*(?:discover|find|realize|understand)\S*")
+_TONE_WORD_RES = {
+    "positive": re.compile(r"\S*(?:happy|joy|great)\S*"),
+    "negative": re.compile(r"\S*(?:sad|fear|dark)\S*"),
+}
+
 
 def process_service_c2(message: PipelineMessage) -> PipelineMessage:
     """
@@ -24,55 +35,43 @@ def process_service_c2(message: PipelineMessage) -> PipelineMessage:
     """
     story = message.story_text or ""
     analysis = message.analysis or {}
-    words = story.split()
+    # Service B's word_count is len(story.split()) of this same story; reuse it
+    # instead of tokenizing the whole story again
+    story_word_count = analysis.get("word_count")
+    if not isinstance(story_word_count, int):
+        story_word_count = len(story.split())
     
     # Phase 1: Audio timing analysis
-    # Analyze sentence lengths for pause placement
+    # Split into sentences for pause placement
     sentences = story.split('. ')
-    sentence_lengths = [len(s.split()) for s in sentences if s.strip()]
+    last_index = len(sentences) - 1
     
-    # Phase 2: Multiple-pass script generation
+    # Phase 2: Script generation
+    # Emphasis detection and marker placement share one pass over the sentences
     script_lines = []
     emphasis_points = []
     pause_points = []
     
-    # First pass: Identify emphasis candidates
     for i, sentence in enumerate(sentences):
         sentence = sentence.strip()
         if not sentence:
             continue
         
-        # Calculate sentence importance (simplified)
-        word_count = len(sentence.split())
-        importance_score = 0
+        sentence_words = sentence.split()
+        word_count = len(sentence_words)
         
-        # Simulate importance calculation with loops
-        for word in sentence.split():
-            importance_score += len(word)
-            # Check for key words
-            if any(kw in word.lower() for kw in ['discover', 'find', 'realize', 'understand']):
-                importance_score += 5
+        # Sentence importance (simplified): word lengths plus a bonus per key word
+        importance_score = sum(map(len, sentence_words))
+        importance_score += 5 * len(_IMPORTANT_WORD_RE.findall(sentence.lower()))
         
-        # Determine emphasis based on importance
+        # Add appropriate markers
         if importance_score > word_count * 3:
             emphasis_points.append(i)
-    
-    # Second pass: Generate script with markers
-    for i, sentence in enumerate(sentences):
-        sentence = sentence.strip()
-        if not sentence:
-            continue
-        
-        word_count = len(sentence.split())
-        needs_pause = word_count > 15 or i % 3 == 0
-        
-        # Add appropriate markers
-        if i in emphasis_points:
             script_lines.append(f"[EMPHASIS] {sentence} [PAUSE]")
             pause_points.append(i)
-        elif i == len(sentences) - 1:
+        elif i == last_index:
             script_lines.append(f"{sentence} [FADE_OUT]")
-        elif needs_pause:
+        elif word_count > 15 or i % 3 == 0:
             script_lines.append(f"{sentence} [PAUSE]")
             pause_points.append(i)
         else:
@@ -81,33 +80,23 @@ def process_service_c2(message: PipelineMessage) -> PipelineMessage:
     narration_script = " ".join(script_lines)
     
     # Phase 3: Duration calculation with detailed analysis
-    total_words = analysis.get("word_count", len(words))
-    
-    # Simulate reading speed calculation (multiple factors)
-    speed_factors = []
-    for factor in range(10):
-        # Simulate factor calculation
-        speed_factor = sum(i for i in range(20)) % 50 + 100
-        speed_factors.append(speed_factor)
+    total_words = analysis.get("word_count", story_word_count)
     
-    avg_speed = sum(speed_factors) / len(speed_factors) if speed_factors else 150
+    # Reading speed: every simulated factor was sum(range(20)) % 50 + 100 == 140
+    avg_speed = _READING_SPEED_WPM
     estimated_duration_minutes = round(total_words / avg_speed, 1)
     
     # Phase 4: Tone analysis with sentiment processing
     sentiment = analysis.get("sentiment", "neutral")
     tone_intensity = 0
     
-    # Calculate tone intensity
-    sentiment_words = {'positive': ['happy', 'joy', 'great'], 
-                       'negative': ['sad', 'fear', 'dark']}
-    relevant_words = sentiment_words.get(sentiment, [])
-    
-    for word in words:
-        if any(sw in word.lower() for sw in relevant_words):
-            tone_intensity += 1
+    # Calculate tone intensity (words containing a term for this sentiment)
+    tone_re = _TONE_WORD_RES.get(sentiment)
+    if tone_re is not None:
+        tone_intensity = len(tone_re.findall(story.lower()))
     
     tone = sentiment
-    if tone_intensity > len(words) / 10:
+    if tone_intensity > story_word_count / 10:
         tone += " (strong)"
     
     audio_script = {
@@ -133,15 +122,14 @@ service_c2 = process_service_c2
 
 def _rpc_handler(params: dict) -> dict:
     pm = PipelineMessage.from_dict(params)
-    tracker = _TimestampTracker()
-    tracker.mark_received(pm, "service_c2_audio_script")
-    tracker.mark_started(pm, "service_c2_audio_script")
+    _TRACKER.mark_received(pm, "service_c2_audio_script")
+    _TRACKER.mark_started(pm, "service_c2_audio_script")
     try:
         result = process_service_c2(pm)
-        tracker.mark_completed(result, "service_c2_audio_script")
-        return result.to_dict()
+        _TRACKER.mark_completed(result, "service_c2_audio_script")
+        return result.to_wire()
     except Exception:
-        tracker.mark_completed(pm, "service_c2_audio_script")
+        _TRACKER.mark_completed(pm, "service_c2_audio_script")
         raise
 
 
@@ -154,15 +142,14 @@ if __name__ == "__main__":
         
         print(f"Starting gRPC server for service_c2 on {host}:{port}")
         def _grpc_handler(pm: PipelineMessage) -> PipelineMessage:
-            tracker = _TimestampTracker()
-            tracker.mark_received(pm, "service_c2_audio_script")
-            tracker.mark_started(pm, "service_c2_audio_script")
+            _TRACKER.mark_received(pm, "service_c2_audio_script")
+            _TRACKER.mark_started(pm, "service_c2_audio_script")
             try:
                 result = process_service_c2(pm)
-                tracker.mark_completed(result, "service_c2_audio_script")
+                _TRACKER.mark_completed(result, "service_c2_audio_script")
                 return result
             except Exception:
-                tracker.mark_completed(pm, "service_c2_audio_script")
+                _TRACKER.mark_completed(pm, "service_c2_audio_script")
                 raise
 
         server = _grpc_server.serve(_grpc_handler, host=host, port=port)
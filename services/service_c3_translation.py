@@ -2,8 +2,8 @@
 Service C3: Translation Service
 Translates the story to multiple languages.
 """
-import time
-import random
+import re
+from collections import Counter
 from core.message import PipelineMessage
 import os
 import json
@@ -11,6 +11,101 @@ import threading
 from core import rpc as _rpc
 from core.timestamp_tracker import TimestampTracker as _TimestampTracker
 
+_TRACKER = _TimestampTracker()
+
+try:
+    import numpy as np
+except ImportError:  # optional; a pure-Python fallback is used
+    np = None
+
+# Translation dictionaries (English phrase -> translation)
+_SPANISH_KEYWORDS = {
+    "Once upon a time": "Había una vez",
+    "in a world where": "en un mundo donde",
+    "they discovered": "descubrieron",
+    "journeyed to": "viajaron a",
+    "encountered": "encontraron",
+    "And so": "Y así",
+    "forever": "para siempre",
+    "adventure": "aventura",
+    "discovery": "descubrimiento",
+    "space": "espacio",
+    "robot": "robot",
+    "story": "historia"
+}
+
+_FRENCH_KEYWORDS = {
+    "Once upon a time": "Il était une fois",
+    "in a world where": "dans un monde où",
+    "they discovered": "ils ont découvert",
+    "journeyed to": "voyagé vers",
+    "encountered": "rencontré",
+    "And so": "Et ainsi",
+    "forever": "pour toujours",
+    "adventure": "aventure",
+    "discovery": "découverte",
+    "space": "espace",
+    "robot": "robot",
+    "story": "histoire"
+}
+
+
+def _phrase_re(keyword_dict: dict):
+    """Alternation of all phrases, longest first so short phrases cannot shadow long ones."""
+    phrases = sorted(keyword_dict, key=len, reverse=True)
+    return re.compile("|".join(re.escape(phrase) for phrase in phrases))
+
+
+def _replace_phrases(text: str, keyword_dict: dict, phrase_re) -> tuple:
+    """Translate every phrase in one scan.
+
+    Returns the translated text and the number of distinct phrases found.
+    """
+    found = set()
+
+    def _sub(match):
+        phrase = match.group(0)
+        found.add(phrase)
+        return keyword_dict[phrase]
+
+    return phrase_re.sub(_sub, text), len(found)
+
+
+def _lower_keys(keyword_dict: dict) -> frozenset:
+    return frozenset(phrase.lower() for phrase in keyword_dict)
+
+
+# language -> (keyword dict, compiled phrase regex, lowercased phrases)
+_LANGUAGE_TABLES = {
+    "spanish": (_SPANISH_KEYWORDS, _phrase_re(_SPANISH_KEYWORDS), _lower_keys(_SPANISH_KEYWORDS)),
+    "french": (_FRENCH_KEYWORDS, _phrase_re(_FRENCH_KEYWORDS), _lower_keys(_FRENCH_KEYWORDS)),
+}
+
+# Punctuation stripped from both ends of a word before the dictionary check
+_WORD_PUNCTUATION = '.,!?;:()[]{}"\''
+
+
+# Every whitespace code point is below this, so one table covers the characters
+# whose quality weight is not simply ord(c) % 10
+_QUALITY_TABLE_SIZE = 0x3001
+_QUALITY_WEIGHTS = None if np is None else np.array(
+    [0 if chr(i).isspace() else i % 10 for i in range(_QUALITY_TABLE_SIZE)], dtype=np.uint8
+)
+
+
+def _quality_score(lower_text: str) -> int:
+    """Simulated translation quality: sum of ord(c) % 10 over non-whitespace characters."""
+    if np is not None:
+        if lower_text.isascii():
+            codes = np.frombuffer(lower_text.encode("ascii"), dtype=np.uint8)
+            return int(_QUALITY_WEIGHTS[codes].sum())
+        codes = np.frombuffer(lower_text.encode("utf-32-le"), dtype=np.uint32)
+        in_table = np.minimum(codes, _QUALITY_TABLE_SIZE - 1)
+        weights = np.where(codes < _QUALITY_TABLE_SIZE, _QUALITY_WEIGHTS[in_table], codes % 10)
+        return int(weights.sum())
+    # Weight each distinct character once
+    return sum(n * (ord(c) % 10) for c, n in Counter(lower_text).items() if not c.isspace())
+
 
 def process_service_c3(message: PipelineMessage) -> PipelineMessage:
     """
@@ -23,93 +118,39 @@ def process_service_c3(message: PipelineMessage) -> PipelineMessage:
         Updated message with translations
     """
     story = message.story_text or ""
-    words = story.split()
     
     translations = {}
     target_languages = ["spanish", "french"]
     
     # Phase 1: Pre-translation analysis
-    # Analyze text complexity
-    word_lengths = [len(word) for word in words]
-    avg_word_length = sum(word_lengths) / len(word_lengths) if word_lengths else 0
-    complexity_score = avg_word_length * len(words)
+    # (The simulated complexity score was never reported, so it is not computed.)
+    # Lowercased, punctuation-stripped words for the dictionary check; they don't
+    # depend on the language, so build them once. (str.translate would also drop
+    # inner punctuation such as the apostrophe in "don't".)
+    clean_words = [word.strip(_WORD_PUNCTUATION) for word in story.lower().split()]
     
-    # Phase 2: Translation dictionary expansion
-    # Build comprehensive translation dictionaries
-    spanish_keywords = {
-        "Once upon a time": "Había una vez",
-        "in a world where": "en un mundo donde",
-        "they discovered": "descubrieron",
-        "journeyed to": "viajaron a",
-        "encountered": "encontraron",
-        "And so": "Y así",
-        "forever": "para siempre",
-        "adventure": "aventura",
-        "discovery": "descubrimiento",
-        "space": "espacio",
-        "robot": "robot",
-        "story": "historia"
-    }
-    
-    french_keywords = {
-        "Once upon a time": "Il était une fois",
-        "in a world where": "dans un monde où",
-        "they discovered": "ils ont découvert",
-        "journeyed to": "voyagé vers",
-        "encountered": "rencontré",
-        "And so": "Et ainsi",
-        "forever": "pour toujours",
-        "adventure": "aventure",
-        "discovery": "découverte",
-        "space": "espace",
-        "robot": "robot",
-        "story": "histoire"
-    }
+    # Phase 2: Translation dictionaries are built once at import (_LANGUAGE_TABLES)
     
     # Phase 3: Multi-pass translation for each language
     for lang in target_languages:
-        if lang == "spanish":
-            keyword_dict = spanish_keywords
-        else:
-            keyword_dict = french_keywords
+        keyword_dict, phrase_re, lower_keys = _LANGUAGE_TABLES[lang]
         
         # First pass: Direct phrase replacement
-        translated_text = story
-        replacement_count = 0
-        for eng_phrase, translation in keyword_dict.items():
-            if eng_phrase in translated_text:
-                translated_text = translated_text.replace(eng_phrase, translation)
-                replacement_count += 1
+        translated_text, replacement_count = _replace_phrases(story, keyword_dict, phrase_re)
         
         # Second pass: Word-level translation (simulated)
         # Analyze remaining untranslated words
-        translated_words = translated_text.split()
-        untranslated_words = []
-        for word in words:
-            if word not in keyword_dict:
-                clean_word = word.lower().strip('.,!?;:()[]{}"\'')
-                if clean_word not in [kw.lower() for kw in keyword_dict.keys()]:
-                    untranslated_words.append(word)
+        # (a word that is itself a key also matches its lowercased, stripped form)
+        untranslated_words = [word for word in clean_words if word not in lower_keys]
         
         # Phase 4: Translation quality scoring
-        translation_scores = []
-        for iteration in range(5):
-            # Simulate translation quality assessment
-            quality_score = 0
-            for word in translated_words:
-                # Simulate quality calculation
-                word_score = sum(ord(c) % 10 for c in word.lower())
-                quality_score += word_score
-            translation_scores.append(quality_score)
-        
-        avg_quality = sum(translation_scores) / len(translation_scores) if translation_scores else 0
+        # Every assessment iteration scored the same text identically, so the
+        # average equals a single pass
+        quality_score = _quality_score(translated_text.lower())
+        avg_quality = float(quality_score)
         
-        # Phase 5: Post-translation processing
-        # Simulate grammar checking and refinement
+        # Phase 5: Post-translation processing (simulated refinement, reported only)
         refinement_passes = 3
-        for pass_num in range(refinement_passes):
-            # Simulate refinement computations
-            _ = sum(i * len(translated_words) * pass_num for i in range(20))
         
         # Store translation with metadata
         translations[lang] = translated_text
@@ -131,15 +172,14 @@ service_c3 = process_service_c3
 
 def _rpc_handler(params: dict) -> dict:
     pm = PipelineMessage.from_dict(params)
-    tracker = _TimestampTracker()
-    tracker.mark_received(pm, "service_c3_translation")
-    tracker.mark_started(pm, "service_c3_translation")
+    _TRACKER.mark_received(pm, "service_c3_translation")
+    _TRACKER.mark_started(pm, "service_c3_translation")
     try:
         result = process_service_c3(pm)
-        tracker.mark_completed(result, "service_c3_translation")
-        return result.to_dict()
+        _TRACKER.mark_completed(result, "service_c3_translation")
+        return result.to_wire()
     except Exception:
-        tracker.mark_completed(pm, "service_c3_translation")
+        _TRACKER.mark_completed(pm, "service_c3_translation")
         raise
 
 
@@ -152,15 +192,14 @@ if __name__ == "__main__":
         
         print(f"Starting gRPC server for service_c3 on {host}:{port}")
         def _grpc_handler(pm: PipelineMessage) -> PipelineMessage:
-            tracker = _TimestampTracker()
-            tracker.mark_received(pm, "service_c3_translation")
-            tracker.mark_started(pm, "service_c3_translation")
+            _TRACKER.mark_received(pm, "service_c3_translation")
+            _TRACKER.mark_started(pm, "service_c3_translation")
             try:
                 result = process_service_c3(pm)
-                tracker.mark_completed(result, "service_c3_translation")
+                _TRACKER.mark_completed(result, "service_c3_translation")
                 return result
             except Exception:
-                tracker.mark_completed(pm, "service_c3_translation")
+                _TRACKER.mark_completed(pm, "service_c3_translation")
                 raise
 
         server = _grpc_server.serve(_grpc_handler, host=host, port=port)
@@ -2,15 +2,105 @@
 Service C: Parallel Processing Hub
 Coordinates parallel execution of multiple services (C1, C2, C3, C4).
 """
-import time
+import atexit
 import concurrent.futures
 from typing import List
-from core.message import PipelineMessage
+from core.message import PipelineMessage, TimestampRecord
 from core.timestamp_tracker import TimestampTracker
 import os
+import time
 from core import rpc as _rpc
 import threading
 
+_TRACKER = TimestampTracker()
+
+
+# The message field each parallel service produces; remote calls ask for just that
+_OUTPUT_FIELDS = {
+    "service_c1_image_concept": "image_concept",
+    "service_c2_audio_script": "audio_script",
+    "service_c3_translation": "translations",
+    "service_c4_formatting": "formatted_output",
+}
+
+# The message fields each parallel service reads; remote calls send only these
+_INPUT_FIELDS = {
+    "service_c1_image_concept": ("story_text", "analysis", "metadata"),
+    "service_c2_audio_script": ("story_text", "analysis"),
+    "service_c3_translation": ("story_text",),
+    "service_c4_formatting": ("story_text", "user_input"),
+}
+
+# Shared pool for the local (in-process) services; threads start on first use
+_LOCAL_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="service_c")
+
+# Pooled gRPC clients keyed by (host, port), created on first use
+_GRPC_CLIENTS = {}
+_GRPC_CLIENTS_LOCK = threading.Lock()
+
+
+def _split_addr(target: str):
+    host, sep, port = target.partition(":")
+    return host, int(port) if port else 8000
+
+
+def _grpc_client(host: str, port: int):
+    key = (host, port)
+    client = _GRPC_CLIENTS.get(key)
+    if client is None:
+        from core.grpc_client import PipelineClient
+
+        with _GRPC_CLIENTS_LOCK:
+            client = _GRPC_CLIENTS.get(key)
+            if client is None:
+                client = _GRPC_CLIENTS[key] = PipelineClient(host, port)
+    return client
+
+
+@atexit.register
+def _close_grpc_clients() -> None:
+    with _GRPC_CLIENTS_LOCK:
+        clients = list(_GRPC_CLIENTS.values())
+        _GRPC_CLIENTS.clear()
+    for client in clients:
+        client.close()
+
+
+def _start_grpc(target: str, message: PipelineMessage, field: str, on_done):
+    """Start a gRPC call to target without blocking.
+
+    on_done() is called as soon as the call finishes (or fails to start); it may
+    run on a grpc thread. Returns a function that waits for the call and returns
+    the result message, or the exception raised. (grpc futures are themselves
+    exceptions, so errors can't simply be returned in their place.)
+    """
+    try:
+        future = _grpc_client(*_split_addr(target)).process_future(message, reply_fields=[field])
+    except Exception as e:
+        on_done()
+        return lambda: e
+    future.add_done_callback(lambda _: on_done())
+
+    def finish():
+        try:
+            from core.grpc_utils import proto_to_pipeline_message
+
+            return proto_to_pipeline_message(future.result())
+        except Exception as e:
+            return e
+
+    return finish
+
+
+def _input_message(message: PipelineMessage, service_name: str) -> PipelineMessage:
+    """Copy of message with only the fields service_name reads (and no timestamps)."""
+    fields = _INPUT_FIELDS[service_name]
+    pm = PipelineMessage(user_input=message.user_input if "user_input" in fields else "")
+    for name in fields:
+        if name != "user_input":
+            setattr(pm, name, getattr(message, name))
+    return pm
+
 
 def process_service_c(message: PipelineMessage) -> PipelineMessage:
     """
@@ -22,10 +112,9 @@ def process_service_c(message: PipelineMessage) -> PipelineMessage:
     Returns:
         Updated message with results from all parallel services
     """
-    tracker = TimestampTracker()
     
     # Mark parallel hub start
-    tracker.mark_started(message, "service_c_parallel_hub")
+    _TRACKER.mark_started(message, "service_c_parallel_hub")
     
     # Define parallel service functions with their names
     # If RPC_MODE is enabled, call remote services via RPC using env addresses, otherwise use local functions
@@ -64,65 +153,79 @@ def process_service_c(message: PipelineMessage) -> PipelineMessage:
             ("service_c4_formatting", process_service_c4),
         ]
     
-    # Execute all services in parallel
-    def execute_with_tracking(service_name, service_target, msg):
-        """Execute a service (local or remote) with timestamp tracking.
-
-        service_target is either a callable (local) or an address string 'host:port' for RPC.
-        """
-        tracker.mark_received(msg, service_name)
-        tracker.mark_started(msg, service_name)
-        result_msg = None
-        if (rpc_mode or grpc_mode) and isinstance(service_target, str):
-            host, sep, port = service_target.partition(":")
-            port = int(port) if port else 8000
-            try:
-                if grpc_mode:
-                    client = _GrpcClient(host, port)
-                    result_msg = client.process(msg)
-                else:
-                    resp = _rpc.rpc_call(host, port, msg.to_dict())
-                    result_msg = PipelineMessage.from_dict(resp)
-            except Exception as e:
-                mode = "gRPC" if grpc_mode else "RPC"
-                print(f"{mode} call to {service_name} at {service_target} failed: {e}")
-                result_msg = msg
+    if rpc_mode or grpc_mode:
+        # Remote services: this thread sends all four requests before waiting on
+        # any reply, so they run concurrently without a thread per call
+        # The hub's own records are placeholders: each one is completed the moment
+        # its service's reply (or error) arrives, and replaced by the record the
+        # service reports about itself when there is one
+        placeholders = _TRACKER.mark_all_started(
+            message, [service_name for service_name, _ in parallel_services]
+        )
+        # Each service gets only the fields it reads and sends back only the field
+        # it produces (plus its timestamps)
+        fields = [_OUTPUT_FIELDS[service_name] for service_name, _ in parallel_services]
+        inputs = [_input_message(message, service_name) for service_name, _ in parallel_services]
+        if grpc_mode:
+            pending = [
+                _start_grpc(target, pm, field, lambda ts=ts: ts.set_completed(time.time_ns()))
+                for (_, target), pm, field, ts in zip(parallel_services, inputs, fields, placeholders)
+            ]
+            outcomes = [finish() for finish in pending]
         else:
-            # Local callable
-            result_msg = service_target(msg)
+            outcomes = _rpc.rpc_call_many(
+                [
+                    (*_split_addr(target), dict(pm.to_wire(), reply_fields=[field]))
+                    for (_, target), pm, field in zip(parallel_services, inputs, fields)
+                ],
+                on_result=lambda i, _: placeholders[i].set_completed(time.time_ns()),
+            )
 
-        tracker.mark_completed(result_msg, service_name)
-        return service_name, result_msg
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
-        # Submit all tasks with tracking
-        futures = {
-            executor.submit(execute_with_tracking, name, func, message): name
+        mode = "gRPC" if grpc_mode else "RPC"
+        timestamps = message.timestamps
+        for (service_name, target), field, reply in zip(parallel_services, fields, outcomes):
+            if isinstance(reply, Exception):
+                print(f"{mode} call to {service_name} at {target} failed: {reply}")
+                continue
+            if grpc_mode:
+                value = getattr(reply, field)
+                records = reply.timestamps
+            else:
+                value = reply.get(field)
+                records = {
+                    ts_name: TimestampRecord.from_entry(ts_name, entry)
+                    for ts_name, entry in (reply.get("timestamps") or {}).items()
+                }
+            if value:
+                setattr(message, field, value)
+            for ts_name, ts_record in records.items():
+                if ts_name == service_name or ts_name not in timestamps:
+                    timestamps[ts_name] = ts_record
+    else:
+        # Local callables do CPU work, so they run on the shared thread pool. They
+        # all update the shared message in place, each writing only its own output
+        # field (plus its own metadata keys and timestamp record), so there is
+        # nothing to merge afterwards.
+        def execute_with_tracking(service_name, service_func):
+            """Execute a local service on message with timestamp tracking."""
+            _TRACKER.mark_received(message, service_name)
+            _TRACKER.mark_started(message, service_name)
+            service_func(message)
+            _TRACKER.mark_completed(message, service_name)
+
+        futures = [
+            _LOCAL_EXECUTOR.submit(execute_with_tracking, name, func)
             for name, func in parallel_services
-        }
+        ]
         
-        # Collect results as they complete
-        for future in concurrent.futures.as_completed(futures):
+        for future in futures:
             try:
-                service_name, result_message = future.result()
-                # Update message with results from this service
-                if result_message.image_concept:
-                    message.image_concept = result_message.image_concept
-                if result_message.audio_script:
-                    message.audio_script = result_message.audio_script
-                if result_message.translations:
-                    message.translations = result_message.translations
-                if result_message.formatted_output:
-                    message.formatted_output = result_message.formatted_output
-                # Merge timestamps
-                for ts_name, ts_record in result_message.timestamps.items():
-                    if ts_name not in message.timestamps:
-                        message.timestamps[ts_name] = ts_record
+                future.result()
             except Exception as e:
                 print(f"Error in parallel service: {e}")
     
     # Mark parallel hub completion
-    tracker.mark_completed(message, "service_c_parallel_hub")
+    _TRACKER.mark_completed(message, "service_c_parallel_hub")
     
     return message
 
@@ -133,15 +236,14 @@ service_c = process_service_c
 
 def _rpc_handler(params: dict) -> dict:
     pm = PipelineMessage.from_dict(params)
-    tracker = TimestampTracker()
-    tracker.mark_received(pm, "service_c_parallel_hub")
-    tracker.mark_started(pm, "service_c_parallel_hub")
+    _TRACKER.mark_received(pm, "service_c_parallel_hub")
+    _TRACKER.mark_started(pm, "service_c_parallel_hub")
     try:
         result = process_service_c(pm)
-        tracker.mark_completed(result, "service_c_parallel_hub")
-        return result.to_dict()
+        _TRACKER.mark_completed(result, "service_c_parallel_hub")
+        return result.to_wire()
     except Exception:
-        tracker.mark_completed(pm, "service_c_parallel_hub")
+        _TRACKER.mark_completed(pm, "service_c_parallel_hub")
         raise
 
 
@@ -152,19 +254,16 @@ if __name__ == "__main__":
     port = int(os.environ.get("PORT", os.environ.get("RPC_PORT", os.environ.get("SERVICE_PORT", "50057"))))
     host = os.environ.get("HOST", "0.0.0.0")
     if mode == "grpc":
-        from core.grpc_client import PipelineClient as _GrpcClient
-        
         print(f"Starting gRPC server for service_c (parallel hub) on {host}:{port}")
         def _grpc_handler(pm: PipelineMessage) -> PipelineMessage:
-            tracker = TimestampTracker()
-            tracker.mark_received(pm, "service_c_parallel_hub")
-            tracker.mark_started(pm, "service_c_parallel_hub")
+            _TRACKER.mark_received(pm, "service_c_parallel_hub")
+            _TRACKER.mark_started(pm, "service_c_parallel_hub")
             try:
                 result = process_service_c(pm)
-                tracker.mark_completed(result, "service_c_parallel_hub")
+                _TRACKER.mark_completed(result, "service_c_parallel_hub")
                 return result
             except Exception:
-                tracker.mark_completed(pm, "service_c_parallel_hub")
+                _TRACKER.mark_completed(pm, "service_c_parallel_hub")
                 raise
         server = _grpc_server.serve(_grpc_handler, host=host, port=port)
     else:
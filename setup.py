@@ -0,0 +1,29 @@
+"""
+Optional build script for the compiled marshalling speedups.
+
+The pipeline runs from a plain checkout; installing is only needed to build the
+Cython-compiled variants of core/grpc_utils.py, core/message.py and
+utils/analysis_kernel.py:
+
+    PIPELINE_ENABLE_SPEEDUPS=1 pip install .
+"""
+import os
+from setuptools import setup, find_packages
+
+ext_modules = []
+if os.environ.get("PIPELINE_ENABLE_SPEEDUPS") == "1":
+    from Cython.Build import cythonize
+
+    ext_modules = cythonize(
+        ["core/grpc_utils.py", "core/message.py", "utils/analysis_kernel.py"],
+        compiler_directives={"language_level": 3},
+    )
+
+setup(
+    name="cst435-pipeline",
+    version="0.1.0",
+    packages=find_packages(include=["core", "core.*", "services", "utils"]),
+    package_data={"core": ["*.pxd"]},
+    ext_modules=ext_modules,
+    python_requires=">=3.8",
+)
@@ -0,0 +1,37 @@
+"""
+Scalar word-level loops used by the story analyzer (Service B).
+
+Kept in their own module so they can be Cython-compiled
+(PIPELINE_ENABLE_SPEEDUPS=1, see setup.py) while the service module itself stays
+runnable with `python -m`. The code is plain Python and behaves the same either way;
+arguments are annotated with abstract types because Cython rejects subclasses
+(such as Counter) of annotated builtin types.
+"""
+from collections import Counter
+from typing import Dict, Iterable, Mapping
+
+# Punctuation stripped from both ends of each word before counting
+WORD_PUNCTUATION = '.,!?;:()[]{}"\''
+
+
+def word_frequency(lower_words: Iterable[str]) -> Counter:
+    """Count lowercased words after stripping surrounding punctuation."""
+    # Counter's C counting loop beats a per-word dict update, and str.strip with a
+    # constant set is already a C scan (str.translate would also drop inner quotes)
+    return Counter(filter(None, [word.strip(WORD_PUNCTUATION) for word in lower_words]))
+
+
+def total_length(words: Iterable[str]) -> int:
+    """Total number of characters over all words."""
+    # map(len) keeps the per-word work in C whether or not this module is compiled
+    return sum(map(len, words))
+
+
+def keyword_scores(word_frequency: Mapping[str, int]) -> Dict[str, int]:
+    """TF-like score (frequency * length) for every word longer than 3 characters."""
+    scores = {}
+    for word, freq in word_frequency.items():
+        length = len(word)
+        if length > 3:
+            scores[word] = freq * length
+    return scores
@@ -1,56 +1,69 @@
 """
 Output formatting utilities for final package generation.
 """
+from html import escape
 
-
-class OutputFormatter:
-    """Formats content into various output formats."""
-    
-    @staticmethod
-    def format_markdown(story: str, title: str = "Generated Story") -> str:
-        """Format story as Markdown."""
-        lines = [f"# {title}\n"]
-        paragraphs = story.split('\n\n')
-        for para in paragraphs:
-            lines.append(para.strip())
-            lines.append("")  # Empty line between paragraphs
-        return "\n".join(lines)
-    
-    @staticmethod
-    def format_html(story: str, title: str = "Generated Story") -> str:
-        """Format story as HTML."""
-        html = f"""<!DOCTYPE html>
+# Fixed parts of the HTML page; "{title}" is substituted per call
+_HTML_HEADER_TMPL = """<!DOCTYPE html>
 <html>
 <head>
     <title>{title}</title>
     <style>
-        body {{
+        body {
             font-family: Georgia, serif;
             max-width: 800px;
             margin: 0 auto;
             padding: 20px;
             line-height: 1.6;
-        }}
-        h1 {{
+        }
+        h1 {
             color: #333;
             border-bottom: 2px solid #333;
             padding-bottom: 10px;
-        }}
-        p {{
+        }
+        p {
             margin-bottom: 15px;
-        }}
+        }
     </style>
 </head>
 <body>
     <h1>{title}</h1>
 """
+
+_HTML_FOOTER = """</body>
+</html>"""
+
+
+def _escape_html(text: str) -> str:
+    """Escape &, <, > and \" (apostrophes are left alone).
+
+    Chained str.replace calls (as in html.escape) beat str.translate as soon as
+    anything needs escaping.
+    """
+    return escape(text, quote=False).replace('"', "&quot;")
+
+
+class OutputFormatter:
+    """Formats content into various output formats."""
+    
+    @staticmethod
+    def format_markdown(story: str, title: str = "Generated Story") -> str:
+        """Format story as Markdown."""
+        lines = [f"# {title}\n"]
         paragraphs = story.split('\n\n')
         for para in paragraphs:
-            html += f"    <p>{para.strip()}</p>\n"
-        
-        html += """</body>
-</html>"""
-        return html
+            lines.append(para.strip())
+            lines.append("")  # Empty line between paragraphs
+        return "\n".join(lines)
+    
+    @staticmethod
+    def format_html(story: str, title: str = "Generated Story") -> str:
+        """Format story as HTML."""
+        # Escape the whole story once rather than per paragraph
+        parts = [_HTML_HEADER_TMPL.replace("{title}", _escape_html(title))]
+        parts.extend([f"    <p>{para.strip()}</p>\n" for para in _escape_html(story).split('\n\n')])
+        parts.append(_HTML_FOOTER)
+        return "".join(parts)
     
     @staticmethod
     def format_json_structured(story: str, metadata: dict) -> dict:
@@ -47,6 +47,9 @@ class StoryGenerator:
         }
     }
     
+    # Theme names in match order, built once for extract_theme's fallback choice
+    _THEMES = tuple(ADVENTURE_THEMES)
+    
     MIDDLE_EVENTS = [
         "Along the way, they encountered challenges that tested their resolve.",
         "However, a mysterious obstacle appeared that changed everything.",
@@ -83,11 +86,11 @@ class StoryGenerator:
     def extract_theme(cls, prompt: str) -> str:
         """Extract theme from user prompt."""
         prompt_lower = prompt.lower()
-        for theme in cls.ADVENTURE_THEMES.keys():
+        for theme in cls._THEMES:
             if theme in prompt_lower:
                 return theme
         # Default to first theme if none matches
-        return random.choice(list(cls.ADVENTURE_THEMES.keys()))
+        return random.choice(cls._THEMES)
     
     @classmethod
     def generate_story(cls, prompt: str, length: str = "medium") -> str:
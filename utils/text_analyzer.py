@@ -2,7 +2,7 @@
 Text analysis utilities for story processing.
 """
 import re
-from typing import Dict, List
+from typing import Dict, Iterable, List
 from collections import Counter
 
 
@@ -10,25 +10,29 @@ class TextAnalyzer:
     """Analyzes text for sentiment, keywords, and statistics."""
     
     # Simple sentiment word lists (can be expanded)
-    POSITIVE_WORDS = {
+    POSITIVE_WORDS = frozenset({
         "happy", "joy", "success", "love", "beautiful", "wonderful", "amazing",
         "fantastic", "brilliant", "delighted", "pleased", "excellent", "great",
         "good", "peaceful", "harmony", "cooperation", "friendship", "triumph",
         "victory", "discovery", "hope", "bright", "inspiring", "heroic"
-    }
+    })
     
-    NEGATIVE_WORDS = {
+    NEGATIVE_WORDS = frozenset({
         "sad", "fear", "danger", "evil", "dark", "terrible", "awful",
         "horrible", "difficult", "struggle", "conflict", "failure", "lost",
         "defeat", "crisis", "threat", "worried", "anxious", "trouble"
-    }
+    })
     
-    NEUTRAL_WORDS = {
+    NEUTRAL_WORDS = frozenset({
         "the", "a", "an", "and", "or", "but", "in", "on", "at", "to", "for",
         "of", "with", "by", "from", "as", "is", "was", "are", "were", "be",
         "been", "being", "have", "has", "had", "do", "does", "did", "will",
         "would", "could", "should", "may", "might", "must", "can"
-    }
+    })
+    
+    # Compiled once; module-level re.split/re.sub would look the pattern up per call
+    _SENTENCE_END_RE = re.compile(r'[.!?]+')
+    _PUNCTUATION_RE = re.compile(r'[^\w\s]')
     
     @classmethod
     def count_words(cls, text: str) -> int:
@@ -40,15 +44,13 @@ class TextAnalyzer:
     def count_sentences(cls, text: str) -> int:
         """Count sentences in text."""
         # Simple sentence counting by punctuation
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-        return len(sentences)
+        sentences = cls._SENTENCE_END_RE.split(text)
+        return len([s for s in sentences if s.strip()])
     
     @classmethod
     def count_paragraphs(cls, text: str) -> int:
         """Count paragraphs in text."""
-        paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-        return len(paragraphs)
+        return len([p for p in text.split('\n\n') if p.strip()])
     
     @classmethod
     def analyze_sentiment(cls, text: str) -> str:
@@ -56,11 +58,15 @@ class TextAnalyzer:
         Analyze sentiment of text.
         Returns: "positive", "negative", or "neutral"
         """
-        text_lower = text.lower()
-        words = text_lower.split()
-        
-        positive_count = sum(1 for word in words if word in cls.POSITIVE_WORDS)
-        negative_count = sum(1 for word in words if word in cls.NEGATIVE_WORDS)
+        return cls._sentiment_from_words(text.lower().split())
+    
+    @classmethod
+    def _sentiment_from_words(cls, words: List[str]) -> str:
+        """analyze_sentiment for the already lowercased, split words."""
+        # Count the words once in C, then probe only the small sentiment vocabularies
+        word_counts = Counter(words)
+        positive_count = sum(word_counts[w] for w in cls.POSITIVE_WORDS if w in word_counts)
+        negative_count = sum(word_counts[w] for w in cls.NEGATIVE_WORDS if w in word_counts)
         
         if positive_count > negative_count * 1.5:
             return "positive"
@@ -75,19 +81,22 @@ class TextAnalyzer:
         Extract top keywords from text.
         Returns list of most frequent meaningful words.
         """
-        # Remove punctuation and convert to lowercase
-        text_clean = re.sub(r'[^\w\s]', '', text.lower())
+        return cls._keywords_from_lower(text.lower(), top_n)
+    
+    @classmethod
+    def _keywords_from_lower(cls, text_lower: str, top_n: int = 5) -> List[str]:
+        """extract_keywords for the already lowercased text."""
+        # Remove punctuation
+        text_clean = cls._PUNCTUATION_RE.sub('', text_lower)
         words = text_clean.split()
-        
-        # Filter out common words
-        meaningful_words = [
-            word for word in words 
-            if word not in cls.NEUTRAL_WORDS 
+
+        # Count every token in C first, then filter the distinct words only;
+        # the filtered dict keeps first-occurrence order, so ties rank the same
+        word_freq = Counter({
+            word: count for word, count in Counter(words).items()
+            if word not in cls.NEUTRAL_WORDS
             and len(word) > 3  # Filter short words
-        ]
-        
-        # Count frequency
-        word_freq = Counter(meaningful_words)
+        })
         
         # Get top N
         top_keywords = [word for word, count in word_freq.most_common(top_n)]
@@ -95,21 +104,22 @@ class TextAnalyzer:
         return top_keywords
     
     @classmethod
-    def extract_characters(cls, text: str, known_characters: List[str] = None) -> List[str]:
+    def extract_characters(cls, text: str, known_characters: Iterable[str] = None) -> List[str]:
         """
         Extract character names or references.
-        Can use known characters list if provided.
+        Can use known characters list if provided; each name is searched for as a
+        substring of the text and matches are returned in the given order.
         """
+        return cls._characters_from(text.lower(), text.split(), known_characters)
+    
+    @classmethod
+    def _characters_from(cls, text_lower: str, words: List[str],
+                         known_characters: Iterable[str] = None) -> List[str]:
+        """extract_characters for the already lowercased text and its split words."""
         if known_characters:
-            found_characters = []
-            text_lower = text.lower()
-            for char in known_characters:
-                if char.lower() in text_lower:
-                    found_characters.append(char)
-            return found_characters
+            return [char for char in known_characters if char.lower() in text_lower]
         
         # Simple extraction: capitalized words that appear multiple times
-        words = text.split()
         capitalized_words = [w.strip('.,!?;:') for w in words if w and w[0].isupper()]
         word_freq = Counter(capitalized_words)
         
@@ -122,27 +132,36 @@ class TextAnalyzer:
     @classmethod
     def calculate_avg_word_length(cls, text: str) -> float:
         """Calculate average word length."""
-        words = text.split()
+        return cls._avg_word_length(text.split())
+    
+    @classmethod
+    def _avg_word_length(cls, words: List[str]) -> float:
+        """calculate_avg_word_length for the already split words."""
         if not words:
             return 0.0
         total_length = sum(len(word.strip('.,!?;:')) for word in words)
         return round(total_length / len(words), 2)
     
     @classmethod
-    def analyze(cls, text: str, known_characters: List[str] = None) -> Dict[str, any]:
+    def analyze(cls, text: str, known_characters: Iterable[str] = None) -> Dict[str, any]:
         """
         Perform comprehensive text analysis.
         
+        The text is split and lowercased once and the pieces are shared by the
+        individual statistics.
+        
         Returns:
             Dictionary with analysis results
         """
+        words = text.split()
+        text_lower = text.lower()
         return {
-            "word_count": cls.count_words(text),
+            "word_count": len(words),
             "sentence_count": cls.count_sentences(text),
             "paragraph_count": cls.count_paragraphs(text),
-            "sentiment": cls.analyze_sentiment(text),
-            "keywords": cls.extract_keywords(text),
-            "characters": cls.extract_characters(text, known_characters),
-            "avg_word_length": cls.calculate_avg_word_length(text)
+            "sentiment": cls._sentiment_from_words(text_lower.split()),
+            "keywords": cls._keywords_from_lower(text_lower),
+            "characters": cls._characters_from(text_lower, words, known_characters),
+            "avg_word_length": cls._avg_word_length(words)
         }
 